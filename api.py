@@ -0,0 +1,358 @@
+"""
+0xDownloader - Local job API
+
+Optional embedded HTTP service (localhost by default) over the download queue:
+enqueue/list/status/pause/resume/abort endpoints plus a server-sent events
+stream fed by the same progress and stage reports the GUI receives.
+
+Endpoints:
+    POST /jobs                   {"url", "resolution" | "quality", "rate_limit"}
+    GET  /jobs                   all jobs
+    GET  /jobs/<id>              one job
+    POST /jobs/<id>/pause|resume|abort
+    GET  /limits, POST /limits   {"global_limit": bytes/s}
+    GET  /postprocess            ffmpeg executor load, CPU time and stage depths
+    GET  /network                shared session, DNS cache and warm-up counters
+    GET  /events[?job=<id>]      text/event-stream
+
+Usage: python api.py [--host HOST] [--port PORT] [-j N]
+"""
+
+import argparse
+import collections
+import itertools
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import config as cfg
+import jobs
+from bandwidth import limiter
+from ffmpeg_pool import get_executor
+from sessions import sessions
+
+# ============================================================================
+# EVENT HUB
+# ============================================================================
+
+
+class EventHub:
+    """Ring buffer of job events shared by every SSE watcher.
+
+    Publishing (on the download threads) is an O(1) append plus an Event.set;
+    a single dispatcher thread wakes the watchers, so the cost of having
+    hundreds of them connected never lands on a download thread. Watchers
+    keep their own cursor and read everything after it from the buffer.
+    """
+
+    def __init__(self, size=cfg.API_EVENT_BUFFER):
+        self._lock = threading.Lock()
+        self._events = collections.deque(maxlen=size)
+        self._seq = 0
+        self._last_progress = {}
+        self._pending = threading.Event()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._dispatcher = threading.Thread(target=self._dispatch_loop, daemon=True)
+        self._dispatcher.start()
+
+    @property
+    def seq(self):
+        return self._seq
+
+    def publish(self, event, job):
+        """Queue listener: record event for job (called from download threads)"""
+        if event == "progress":
+            # Watchers only need a few updates per second per job
+            now = time.monotonic()
+            if (
+                job.progress < 100
+                and now - self._last_progress.get(job.id, 0)
+                < cfg.API_PROGRESS_MIN_INTERVAL
+            ):
+                return
+            self._last_progress[job.id] = now
+        elif event == "state" and job.state in jobs.FINAL_STATES:
+            self._last_progress.pop(job.id, None)
+
+        with self._lock:
+            self._seq += 1
+            self._events.append((self._seq, event, job.id, job.snapshot()))
+        self._pending.set()
+
+    def read(self, after, job_id=None):
+        """(events newer than seq `after`, new cursor, whether some were dropped)"""
+        with self._lock:
+            if not self._events:
+                return [], self._seq, False
+            first = self._events[0][0]
+            start = max(after + 1 - first, 0)
+            events = list(itertools.islice(self._events, start, None))
+            cursor = self._seq
+        if job_id is not None:
+            events = [e for e in events if e[2] == job_id]
+        return events, cursor, after + 1 < first
+
+    def wait(self, after, timeout):
+        """Block until an event newer than `after` exists (or timeout)"""
+        with self._cond:
+            if self._seq <= after and not self._closed:
+                self._cond.wait(timeout)
+        return not self._closed
+
+    def close(self):
+        self._closed = True
+        self._pending.set()
+
+    def _dispatch_loop(self):
+        while not self._closed:
+            self._pending.wait()
+            self._pending.clear()
+            with self._cond:
+                self._cond.notify_all()
+            # Coalesce bursts from several jobs into one wake-up
+            time.sleep(0.05)
+        with self._cond:
+            self._cond.notify_all()
+
+
+# ============================================================================
+# HTTP HANDLER
+# ============================================================================
+
+
+class JobAPIHandler(BaseHTTPRequestHandler):
+    server_version = "0xDownloader"
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def queue(self):
+        return self.server.download_queue
+
+    def log_message(self, fmt, *args):
+        pass
+
+    # --- helpers ---
+
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _error(self, status, message):
+        self._send_json({"error": message}, status)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return {}
+        data = json.loads(self.rfile.read(length).decode("utf-8"))
+        if not isinstance(data, dict):
+            raise ValueError("JSON object expected")
+        return data
+
+    def _route(self):
+        url = urlparse(self.path)
+        parts = [p for p in url.path.split("/") if p]
+        return parts, parse_qs(url.query)
+
+    def _job(self, job_id):
+        try:
+            return self.queue.get(int(job_id))
+        except ValueError:
+            return None
+
+    # --- verbs ---
+
+    def do_GET(self):
+        parts, query = self._route()
+
+        if parts == ["jobs"]:
+            self._send_json([j.snapshot() for j in self.queue.jobs()])
+        elif len(parts) == 2 and parts[0] == "jobs":
+            job = self._job(parts[1])
+            if job is None:
+                return self._error(404, "job not found")
+            self._send_json(job.snapshot())
+        elif parts == ["limits"]:
+            self._send_json(limiter.stats())
+        elif parts == ["postprocess"]:
+            stats = get_executor().stats()
+            stats["stage_depths"] = self.queue.stage_depths()
+            self._send_json(stats)
+        elif parts == ["network"]:
+            self._send_json(sessions.stats())
+        elif parts == ["events"]:
+            job_id = query.get("job", [None])[0]
+            if job_id is not None and not job_id.isdigit():
+                return self._error(400, "job must be a job id")
+            self._stream_events(int(job_id) if job_id else None)
+        else:
+            self._error(404, "not found")
+
+    def do_POST(self):
+        parts, _ = self._route()
+        try:
+            data = self._read_json()
+        except ValueError as e:
+            return self._error(400, f"invalid JSON: {e}")
+
+        if parts == ["jobs"]:
+            self._submit(data)
+        elif len(parts) == 3 and parts[0] == "jobs":
+            job = self._job(parts[1])
+            if job is None:
+                return self._error(404, "job not found")
+            action = {"pause": job.pause, "resume": job.resume, "abort": job.abort}
+            if parts[2] not in action:
+                return self._error(404, "unknown action")
+            action[parts[2]]()
+            self._send_json(job.snapshot())
+        elif parts == ["limits"]:
+            try:
+                limiter.set_global_limit(float(data.get("global_limit") or 0))
+            except (TypeError, ValueError):
+                return self._error(400, "global_limit must be a number")
+            self._send_json(limiter.stats())
+        else:
+            self._error(404, "not found")
+
+    def _submit(self, data):
+        url = data.get("url")
+        if not url or not isinstance(url, str):
+            return self._error(400, "url is required")
+
+        resolution = data.get("resolution")
+        quality = None if resolution else data.get("quality", "best")
+        try:
+            resolution, quality, rate_limit = jobs.validate_request(
+                resolution, quality, data.get("rate_limit")
+            )
+            job = self.queue.submit(
+                url, resolution, rate_limit=rate_limit, quality=quality
+            )
+        except ValueError as e:
+            return self._error(400, str(e))
+        except RuntimeError as e:
+            return self._error(503, str(e))
+        self._send_json(job.snapshot(), 201)
+
+    # --- server-sent events ---
+
+    def _stream_events(self, job_id=None):
+        hub = self.server.hub
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        # Start from the current state so late subscribers are not blind
+        cursor = hub.seq
+        try:
+            snapshots = self.queue.jobs()
+            if job_id is not None:
+                snapshots = [j for j in snapshots if j.id == job_id]
+            for job in snapshots:
+                self._write_event("snapshot", job.snapshot(), cursor)
+            self.wfile.flush()
+
+            while hub.wait(cursor, cfg.API_HEARTBEAT_INTERVAL):
+                events, cursor, dropped = hub.read(cursor, job_id)
+                if dropped:
+                    # Too slow a reader: some events fell off the ring buffer
+                    self._write_event("overflow", {"dropped": True}, cursor)
+                for seq, event, _, snapshot in events:
+                    self._write_event(event, snapshot, seq)
+                if not events:
+                    self.wfile.write(b": keep-alive\n\n")
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError, OSError):
+            pass
+
+    def _write_event(self, event, data, seq):
+        payload = json.dumps(data, ensure_ascii=False)
+        self.wfile.write(f"id: {seq}\nevent: {event}\ndata: {payload}\n\n".encode())
+
+
+# ============================================================================
+# SERVER
+# ============================================================================
+
+
+class JobAPIServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256  # many watchers may connect at once
+
+    def __init__(self, download_queue, host=cfg.API_HOST, port=cfg.API_PORT):
+        super().__init__((host, port), JobAPIHandler)
+        self.download_queue = download_queue
+        self.hub = EventHub()
+        download_queue.add_listener(self.hub.publish)
+        self._thread = None
+
+    def start(self):
+        """Serve in a background daemon thread"""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        host, port = self.server_address[:2]
+        print(f"[INFO] Job API listening on http://{host}:{port}")
+        return self
+
+    def stop(self):
+        self.download_queue.remove_listener(self.hub.publish)
+        self.hub.close()
+        self.shutdown()
+        self.server_close()
+
+
+def start_api(download_queue, host=cfg.API_HOST, port=cfg.API_PORT):
+    """Start the API over an existing queue; None if the port is unavailable"""
+    try:
+        return JobAPIServer(download_queue, host, port).start()
+    except OSError as e:
+        print(f"[WARNING] Job API could not start on {host}:{port}: {e}")
+        return None
+
+
+# ============================================================================
+# ENTRY POINT
+# ============================================================================
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="api.py", description="0xDownloader local job API"
+    )
+    parser.add_argument("--host", default=cfg.API_HOST)
+    parser.add_argument("--port", type=int, default=cfg.API_PORT)
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=cfg.DL_MAX_PARALLEL_JOBS,
+        help="parallel downloads",
+    )
+    args = parser.parse_args(argv)
+
+    queue = jobs.DownloadQueue(max_workers=args.jobs)
+    server = JobAPIServer(queue, args.host, args.port).start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print("[INFO] Shutting down job API...")
+    finally:
+        server.stop()
+        queue.shutdown(abort=True)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
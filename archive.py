@@ -0,0 +1,250 @@
+"""
+0xDownloader - Download archive
+
+Index of finished downloads keyed by canonical video ID + quality + container,
+kept in a compact append-only JSON-lines file next to the downloads, so a video
+that is already on disk is recognized when its link is pasted and is not
+downloaded again. Also hands out free output names from an in-memory index of
+the download folder instead of probing "name (1)", "name (2)"... on disk.
+"""
+
+import json
+import os
+import threading
+import time
+
+import config as cfg
+from journal import DownloadJournal
+
+
+def archive_key(video_id, resolution, ext):
+    return f"{DownloadJournal.key_for(video_id, resolution)}.{ext}"
+
+
+# ============================================================================
+# ARCHIVE
+# ============================================================================
+
+
+class DownloadArchive:
+    """Append-only record of finished downloads, indexed in memory.
+
+    Every add or removal is one appended line; the file is rewritten with
+    only the live records when superseded lines start to dominate it.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(
+            os.getcwd(), cfg.DL_FOLDER_NAME, cfg.ARCHIVE_FILE_NAME
+        )
+        self._lock = threading.Lock()
+        self._records = None
+        self._by_video = {}
+        self._lines = 0
+
+    # --- public API ---
+
+    def lookup(self, video_id, resolution, ext):
+        """Archived record for this exact target whose file still exists"""
+        if not video_id:
+            return None
+        with self._lock:
+            self._load()
+            record = self._records.get(archive_key(video_id, resolution, ext))
+        return self._verified(record)
+
+    def find(self, video_id):
+        """All archived downloads of video_id still on disk, newest first"""
+        if not video_id:
+            return []
+        with self._lock:
+            self._load()
+            keys = list(self._by_video.get(video_id, ()))
+            records = [self._records[k] for k in keys]
+        found = [r for r in map(self._verified, records) if r is not None]
+        return sorted(found, key=lambda r: r["added_at"], reverse=True)
+
+    def add(self, video_id, resolution, path, url=None, title=None, sha256=None):
+        if not video_id:
+            return
+        ext = os.path.splitext(path)[1].lstrip(".")
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            size = 0
+        record = {
+            "key": archive_key(video_id, resolution, ext),
+            "video_id": video_id,
+            "resolution": resolution,
+            "ext": ext,
+            "path": path,
+            "size": size,
+            "sha256": sha256,
+            "title": title,
+            "url": url,
+            "added_at": time.time(),
+        }
+        with self._lock:
+            self._load()
+            self._index(record)
+            self._append(record)
+
+    def remove(self, key):
+        with self._lock:
+            self._load()
+            if self._unindex(key):
+                self._append({"key": key, "removed": True})
+
+    # --- internals ---
+
+    def _verified(self, record):
+        """record if its file is still there, else drop it (one stat per hit)"""
+        if record is None:
+            return None
+        if os.path.exists(record["path"]):
+            return record
+        self.remove(record["key"])
+        return None
+
+    def _index(self, record):
+        self._records[record["key"]] = record
+        self._by_video.setdefault(record["video_id"], set()).add(record["key"])
+
+    def _unindex(self, key):
+        record = self._records.pop(key, None)
+        if record is None:
+            return False
+        keys = self._by_video.get(record["video_id"], set())
+        keys.discard(key)
+        if not keys:
+            self._by_video.pop(record["video_id"], None)
+        return True
+
+    def _load(self):
+        if self._records is not None:
+            return
+        self._records = {}
+        self._lines = 0
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # torn last line of an interrupted write
+                    self._lines += 1
+                    if record.get("removed"):
+                        self._unindex(record.get("key"))
+                    elif record.get("key") and record.get("video_id"):
+                        self._index(record)
+        except OSError:
+            return
+        if self._lines > cfg.ARCHIVE_COMPACT_MIN_LINES and self._lines > 2 * len(
+            self._records
+        ):
+            self._compact()
+
+    def _append(self, record):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._lines += 1
+        except OSError as e:
+            print(f"[WARNING] Archive write failed: {e}")
+
+    def _compact(self):
+        try:
+            with open(self.path + ".tmp", "w", encoding="utf-8") as f:
+                for record in self._records.values():
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            os.replace(self.path + ".tmp", self.path)
+            self._lines = len(self._records)
+        except OSError:
+            pass
+
+
+# ============================================================================
+# OUTPUT NAMES
+# ============================================================================
+
+
+class NameIndex:
+    """In-memory view of the names taken in the download folders.
+
+    A folder is listed once and re-listed only when its mtime changes.
+    Names are output stems ("<name>" of "<name>.mp4", "<name>.f137.mp4.part").
+    Names handed out stay reserved for the session, so two jobs started
+    together never pick the same output file; a name is also held while a
+    job is writing under it, so a resumed job can't attach to it twice.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._listings = {}
+        self._reserved = {}
+        self._active = {}
+        self._next_suffix = {}
+
+    def _taken(self, folder):
+        try:
+            mtime = os.stat(folder).st_mtime_ns
+        except OSError:
+            return set()
+        listing = self._listings.get(folder)
+        if listing is None or listing[0] != mtime:
+            names = {os.path.normcase(n) for n in os.listdir(folder)}
+            listing = self._listings[folder] = (mtime, names)
+        return listing[1]
+
+    def reserve(self, folder, name):
+        """Hold a journaled name for a resumed job; False if a job holds it"""
+        stem = os.path.normcase(name)
+        with self._lock:
+            active = self._active.setdefault(folder, set())
+            if stem in active:
+                return False
+            active.add(stem)
+            self._reserved.setdefault(folder, set()).add(stem)
+            return True
+
+    def release(self, folder, name):
+        """The job writing under name is done with it (it stays reserved)"""
+        with self._lock:
+            self._active.get(folder, set()).discard(os.path.normcase(name))
+
+    def allocate(self, folder, basename, ext, owned=()):
+        """Free "<basename>[ (n)]" for ext in folder, held for the caller.
+
+        owned names (other journaled downloads) count as taken.
+        """
+        owned = {os.path.normcase(n) for n in owned if n}
+        with self._lock:
+            taken = self._taken(folder)
+            reserved = self._reserved.setdefault(folder, set())
+
+            def is_taken(candidate):
+                stem = os.path.normcase(candidate)
+                return (
+                    os.path.normcase(f"{candidate}.{ext}") in taken
+                    or stem in reserved
+                    or stem in owned
+                )
+
+            candidate = basename
+            if is_taken(candidate):
+                # Resume counting where the last allocation for this name stopped
+                hint_key = (folder, os.path.normcase(basename), ext)
+                counter = self._next_suffix.get(hint_key, 1)
+                while is_taken(f"{basename} ({counter})"):
+                    counter += 1
+                candidate = f"{basename} ({counter})"
+                self._next_suffix[hint_key] = counter + 1
+
+            reserved.add(os.path.normcase(candidate))
+            self._active.setdefault(folder, set()).add(os.path.normcase(candidate))
+            return candidate
+
+
+archive = DownloadArchive()
+names = NameIndex()
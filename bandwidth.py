@@ -0,0 +1,144 @@
+"""
+0xDownloader - Bandwidth limiter
+
+Token-bucket rate limiting shared by every running download: one global bucket
+caps total throughput, each job gets a fair share of it (optionally capped
+further per job), and limits can be changed at runtime without restarting jobs.
+"""
+
+import threading
+import time
+
+import config as cfg
+
+
+class TokenBucket:
+    """Classic token bucket; a rate of 0 means unlimited"""
+
+    def __init__(self, rate=0, burst_seconds=cfg.BW_BURST_SECONDS):
+        self.rate = float(rate or 0)
+        self.burst_seconds = burst_seconds
+        self.tokens = self.capacity
+        self.last = time.monotonic()
+
+    @property
+    def capacity(self):
+        return self.rate * self.burst_seconds
+
+    def set_rate(self, rate):
+        self._refill()
+        self.rate = float(rate or 0)
+        self.tokens = min(self.tokens, self.capacity)
+
+    def _refill(self):
+        now = time.monotonic()
+        if self.rate > 0:
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.last) * self.rate
+            )
+        self.last = now
+
+    def reserve(self, nbytes):
+        """Take nbytes (going into debt if needed); return seconds to wait"""
+        self._refill()
+        if self.rate <= 0:
+            return 0.0
+        self.tokens -= nbytes
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+class BandwidthLimiter:
+    """Global bucket plus one fair-share bucket per active job"""
+
+    def __init__(
+        self, global_limit=cfg.BW_GLOBAL_LIMIT, default_job_limit=cfg.BW_JOB_LIMIT
+    ):
+        self._lock = threading.Lock()
+        self._global = TokenBucket(global_limit)
+        self.default_job_limit = default_job_limit
+        self._jobs = {}
+
+    # --- runtime configuration ---
+
+    @property
+    def global_limit(self):
+        return self._global.rate
+
+    @property
+    def enabled(self):
+        with self._lock:
+            if self._global.rate > 0 or self.default_job_limit > 0:
+                return True
+            return any(j["cap"] > 0 for j in self._jobs.values())
+
+    def set_global_limit(self, bytes_per_sec):
+        with self._lock:
+            self._global.set_rate(bytes_per_sec)
+
+    def set_job_limit(self, job_key, bytes_per_sec):
+        with self._lock:
+            self._job(job_key)["cap"] = float(bytes_per_sec or 0)
+
+    def forget(self, job_key):
+        with self._lock:
+            self._jobs.pop(job_key, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "global_limit": self._global.rate,
+                "jobs": {
+                    k: {"cap": j["cap"], "share": j["bucket"].rate}
+                    for k, j in self._jobs.items()
+                },
+            }
+
+    # --- throttling ---
+
+    def _job(self, job_key):
+        job = self._jobs.get(job_key)
+        if job is None:
+            job = {
+                "cap": float(self.default_job_limit or 0),
+                "bucket": TokenBucket(),
+                "last_seen": 0.0,
+            }
+            self._jobs[job_key] = job
+        return job
+
+    def _fair_share(self, job):
+        """min(per-job cap, global rate / number of jobs moving data right now)"""
+        now = time.monotonic()
+        active = sum(
+            1
+            for j in self._jobs.values()
+            if now - j["last_seen"] < cfg.BW_IDLE_AFTER or j is job
+        )
+        share = self._global.rate / active if self._global.rate > 0 else 0
+        caps = [r for r in (share, job["cap"]) if r > 0]
+        return min(caps) if caps else 0
+
+    def throttle(self, job_key, nbytes, check_abort=None):
+        """Account nbytes for job_key and sleep as long as the buckets require"""
+        if nbytes <= 0:
+            return
+
+        with self._lock:
+            job = self._job(job_key)
+            job["last_seen"] = time.monotonic()
+            rate = self._fair_share(job)
+            if job["bucket"].rate != rate:
+                job["bucket"].set_rate(rate)
+            wait = max(self._global.reserve(nbytes), job["bucket"].reserve(nbytes))
+
+        deadline = time.monotonic() + wait
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            if check_abort and check_abort():
+                return
+            time.sleep(min(remaining, 0.1))
+
+
+limiter = BandwidthLimiter()
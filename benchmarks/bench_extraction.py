@@ -0,0 +1,72 @@
+"""
+0xDownloader - Extraction latency benchmark
+
+Compares metadata analysis latency of the old `yt-dlp --dump-json` subprocess path
+against the warm in-process ExtractionEngine.
+
+Usage: python benchmarks/bench_extraction.py URL [RUNS]
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine import ExtractionEngine
+
+
+def bench_subprocess(url):
+    start = time.perf_counter()
+    process = subprocess.run(
+        [sys.executable, "-m", "yt_dlp", url, "--dump-json", "--no-playlist"],
+        capture_output=True,
+        text=True,
+        encoding="utf-8",
+    )
+    if process.returncode != 0:
+        raise RuntimeError(process.stderr)
+    json.loads(process.stdout)
+    return time.perf_counter() - start
+
+
+def bench_engine(engine, url):
+    start = time.perf_counter()
+    engine.extract(url)
+    return time.perf_counter() - start
+
+
+def report(label, samples):
+    print(
+        f"{label:<22} first {samples[0]:6.2f}s | "
+        f"median {statistics.median(samples):6.2f}s | "
+        f"min {min(samples):6.2f}s | max {max(samples):6.2f}s"
+    )
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+
+    url = sys.argv[1]
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    cli_samples = [bench_subprocess(url) for _ in range(runs)]
+
+    engine = ExtractionEngine(pool_size=1)
+    engine_samples = [bench_engine(engine, url) for _ in range(runs)]
+    engine.close()
+
+    print(f"Extraction latency over {runs} runs: {url}")
+    report("subprocess --dump-json", cli_samples)
+    report("in-process engine", engine_samples)
+    speedup = statistics.median(cli_samples) / statistics.median(engine_samples)
+    print(f"Median speedup: {speedup:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
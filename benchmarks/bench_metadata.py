@@ -0,0 +1,175 @@
+"""
+0xDownloader - Metadata memory benchmark
+
+Measures the memory held by a few hundred extracted videos when each handler
+keeps the whole --dump-json dict against the compact form (compact_info) plus
+its FormatIndex. The info dicts are synthetic but shaped like YouTube's: ~70
+formats with signed URLs and per-format headers, storyboards, thumbnails and
+an automatic caption map in ~150 languages.
+
+Usage: python benchmarks/bench_metadata.py [VIDEOS]
+"""
+
+import gc
+import json
+import os
+import random
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.compact_info import compact_info
+from modules.format_index import FormatIndex
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "en-us,en;q=0.5",
+    "Sec-Fetch-Mode": "navigate",
+}
+VIDEO_CODECS = ("avc1.640028", "vp09.00.40.08", "av01.0.08M.08")
+CAPTION_EXTS = ("json3", "srv1", "srv2", "srv3", "ttml", "srt", "vtt")
+
+
+def signed_url(rng, video_id, itag):
+    sig = rng.getrandbits(2400).to_bytes(300, "big").hex()
+    return (
+        f"https://rr3---sn-abc.googlevideo.com/videoplayback?expire=1700000000"
+        f"&ei={video_id}&itag={itag}&source=youtube&sig={sig}"
+    )
+
+
+def synthetic_info(index, rng):
+    """JSON text of one YouTube-shaped info dict"""
+    video_id = f"v{index:010d}"
+    formats = []
+    for i in range(4):
+        formats.append(
+            {
+                "format_id": f"sb{i}",
+                "protocol": "mhtml",
+                "ext": "mhtml",
+                "vcodec": "none",
+                "acodec": "none",
+                "url": signed_url(rng, video_id, f"sb{i}"),
+                "fragments": [
+                    {"url": signed_url(rng, video_id, f"sb{i}-{n}"), "duration": 10}
+                    for n in range(60)
+                ],
+            }
+        )
+    for itag in range(140, 146):
+        formats.append(
+            {
+                "format_id": str(itag),
+                "format_note": "medium",
+                "ext": "m4a" if itag % 2 else "webm",
+                "protocol": "https",
+                "acodec": "mp4a.40.2" if itag % 2 else "opus",
+                "vcodec": "none",
+                "abr": 128.0 + itag,
+                "asr": 48000,
+                "audio_channels": 2,
+                "filesize": 3_000_000 + itag,
+                "url": signed_url(rng, video_id, itag),
+                "http_headers": dict(HEADERS),
+                "downloader_options": {"http_chunk_size": 10485760},
+                "container": "m4a_dash",
+                "format": f"{itag} - audio only (medium)",
+            }
+        )
+    for n, height in enumerate((144, 240, 360, 480, 720, 1080, 1440, 2160) * 8):
+        itag = 160 + n
+        formats.append(
+            {
+                "format_id": str(itag),
+                "format_note": f"{height}p",
+                "ext": "mp4",
+                "protocol": "https",
+                "vcodec": VIDEO_CODECS[n % 3],
+                "acodec": "none",
+                "height": height,
+                "width": height * 16 // 9,
+                "fps": 30 if n % 2 else 60,
+                "tbr": height * 2.5,
+                "vbr": height * 2.5,
+                "filesize": height * 40_000 + n,
+                "dynamic_range": "SDR",
+                "url": signed_url(rng, video_id, itag),
+                "http_headers": dict(HEADERS),
+                "downloader_options": {"http_chunk_size": 10485760},
+                "format": f"{itag} - {height * 16 // 9}x{height} ({height}p)",
+                "resolution": f"{height * 16 // 9}x{height}",
+            }
+        )
+
+    captions = {
+        f"lang{lang}": [
+            {"ext": ext, "url": signed_url(rng, video_id, f"cc-{lang}-{ext}")[:400]}
+            for ext in CAPTION_EXTS
+        ]
+        for lang in range(150)
+    }
+    thumbnails = [
+        {"url": f"https://i.ytimg.com/vi/{video_id}/{n}.jpg", "preference": -n}
+        for n in range(40)
+    ]
+    info = {
+        "id": video_id,
+        "title": f"Synthetic video {index}",
+        "duration": 600,
+        "extractor": "youtube",
+        "extractor_key": "Youtube",
+        "webpage_url": f"https://www.youtube.com/watch?v={video_id}",
+        "description": "lorem ipsum " * 300,
+        "tags": [f"tag{n}" for n in range(30)],
+        "formats": formats,
+        "thumbnails": thumbnails,
+        "automatic_captions": captions,
+        "heatmap": [{"start_time": n, "value": 0.5} for n in range(100)],
+    }
+    info["requested_formats"] = [formats[-1], formats[5]]
+    return json.dumps(info)
+
+
+def measure(build, count):
+    # One template; every video gets its own id and fresh objects, as after
+    # a real JSON extraction
+    template = synthetic_info(0, random.Random(1))
+    gc.collect()
+    tracemalloc.start()
+    kept = [
+        build(json.loads(template.replace("v0000000000", f"v{i:010d}")))
+        for i in range(count)
+    ]
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return current
+
+
+def keep_full(info):
+    return info
+
+
+def keep_compact(info):
+    slim, _ = compact_info(info)
+    return slim, FormatIndex(slim)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    full = measure(keep_full, count)
+    compact = measure(keep_compact, count)
+
+    print(f"videos: {count}")
+    print(f"full info dicts        {full / 1024 / 1024:8.1f} MB")
+    print(f"compact + FormatIndex  {compact / 1024 / 1024:8.1f} MB")
+    print(f"per video full         {full / count / 1024:8.0f} KB")
+    print(f"per video compact      {compact / count / 1024:8.0f} KB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+0xDownloader - Progress hook overhead benchmark
+
+Measures the per-callback cost of the old speed averaging (sum/len over a deque
+of yt-dlp speeds) against ProgressEstimator.update, feeding both with the same
+synthetic stream of progress reports.
+
+Usage: python benchmarks/bench_progress.py [CALLBACKS]
+"""
+
+import os
+import sys
+import time
+from collections import deque
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config as cfg
+from progress import ProgressEstimator
+
+TOTAL_BYTES = 500 * 1024 * 1024
+SMOOTHING_WINDOW = 10
+
+
+def reports(count):
+    """(bytes_done, transferred, speed, now) as two interleaved streams report them"""
+    chunk = TOTAL_BYTES // count
+    now = 0.0
+    for i in range(count):
+        now += 0.002
+        yield (i + 1) * chunk, chunk, 5_000_000.0 + (i % 7) * 1000, now
+
+
+def bench_old(samples):
+    speed_buffer = deque(maxlen=SMOOTHING_WINDOW)
+    last_ui_update_time = 0
+    start = time.perf_counter()
+    for done, _, speed, now in samples:
+        p = min(done / TOTAL_BYTES * 100, 99.9)
+        speed_buffer.append(speed)
+        avg_speed = sum(speed_buffer) / len(speed_buffer)
+        if now - last_ui_update_time > cfg.DL_UI_UPDATE_DELAY or p >= 99.0:
+            last_ui_update_time = now
+            max(TOTAL_BYTES - done, 0) / avg_speed
+    return time.perf_counter() - start
+
+
+def bench_estimator(samples):
+    clock = iter(s[3] for s in samples).__next__
+    estimator = ProgressEstimator(TOTAL_BYTES, kind=None, merge_model=None, clock=clock)
+    start = time.perf_counter()
+    for done, transferred, _, _ in samples:
+        if estimator.update(done, transferred):
+            estimator.eta
+    return time.perf_counter() - start
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    samples = list(reports(count))
+
+    old = min(bench_old(samples) for _ in range(5))
+    new = min(bench_estimator(samples) for _ in range(5))
+
+    print(f"callbacks: {count}")
+    print(f"deque average   {old / count * 1e9:8.0f} ns/callback")
+    print(f"EWMA estimator  {new / count * 1e9:8.0f} ns/callback")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""
+0xDownloader - Headless CLI
+
+Batch downloads without Tk: reads URLs from arguments, a file or stdin, hands
+each one with its quality rule to the download queue (which analyzes and runs
+them concurrently) and prints machine-readable progress as JSON lines on stdout
+(human logs go to stderr).
+
+Usage: python cli.py [URL ...] [-f FILE] [-q RULE] [-j N] [--rate-limit BPS] [--resume]
+       python cli.py --verify
+"""
+
+import argparse
+import json
+import sys
+import threading
+import time
+
+import config as cfg
+import jobs
+from bandwidth import limiter
+from hashing import manifest
+
+# ============================================================================
+# JSON LINES OUTPUT
+# ============================================================================
+
+_out = sys.stdout
+_out_lock = threading.Lock()
+
+
+def emit(event, **fields):
+    record = {"event": event, "time": round(time.time(), 3), **fields}
+    with _out_lock:
+        _out.write(json.dumps(record, ensure_ascii=False) + "\n")
+        _out.flush()
+
+
+# ============================================================================
+# INPUT
+# ============================================================================
+
+
+def read_targets(args):
+    """(url, rule) pairs from arguments, --file and stdin; a line may be 'URL RULE'"""
+    lines = list(args.urls)
+    if args.file:
+        with open(args.file, "r", encoding="utf-8") as f:
+            lines.extend(f.read().splitlines())
+    if args.stdin or (not lines and not sys.stdin.isatty()):
+        lines.extend(sys.stdin.read().splitlines())
+
+    targets = []
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        parts = line.split()
+        rule = parts[1] if len(parts) > 1 else args.quality
+        targets.append((parts[0], rule))
+    return targets
+
+
+# ============================================================================
+# JOB CALLBACKS
+# ============================================================================
+
+
+def on_progress(job, progress, speed, eta, size):
+    emit(
+        "progress",
+        job=job.id,
+        url=job.url,
+        progress=round(progress, 2),
+        speed=speed,
+        eta=eta,
+        size=size,
+    )
+
+
+def on_stage(job, state):
+    emit("state", job=job.id, url=job.url, state=state)
+
+
+def on_complete(job):
+    emit(
+        "done" if job.success else "failed",
+        job=job.id,
+        url=job.url,
+        resolution=job.resolution,
+        file=job.final_file,
+        error=job.error,
+    )
+
+
+# ============================================================================
+# ENTRY POINT
+# ============================================================================
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="cli.py", description="0xDownloader headless batch downloader"
+    )
+    parser.add_argument("urls", nargs="*", help="video URLs")
+    parser.add_argument("-f", "--file", help="file with one 'URL [RULE]' per line")
+    parser.add_argument("--stdin", action="store_true", help="also read URLs from stdin")
+    parser.add_argument(
+        "-q",
+        "--quality",
+        default="best",
+        help="best | worst | audio | 1080p | <=720 (default: best)",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=cfg.DL_MAX_PARALLEL_JOBS,
+        help="parallel downloads",
+    )
+    parser.add_argument(
+        "--rate-limit", type=int, default=0, help="global limit in bytes/s"
+    )
+    parser.add_argument(
+        "--resume", action="store_true", help="resume journaled interrupted jobs"
+    )
+    parser.add_argument(
+        "--verify",
+        action="store_true",
+        help="check downloaded files against their hash manifest and exit",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    global _out
+
+    args = parse_args(argv)
+
+    # stdout carries JSON only; yt-dlp and [INFO] logs go to stderr
+    _out = sys.stdout
+    sys.stdout = sys.stderr
+
+    if args.verify:
+        results = manifest.verify()
+        for result in results:
+            emit("verified", **result)
+        bad = sum(1 for r in results if r["status"] != "ok")
+        emit("summary", total=len(results), failed=bad)
+        return 1 if bad else 0
+
+    if args.rate_limit:
+        limiter.set_global_limit(args.rate_limit)
+
+    queue = jobs.DownloadQueue(max_workers=args.jobs)
+    submitted = []
+
+    if args.resume:
+        submitted.extend(
+            queue.resume_pending(
+                on_progress=on_progress, on_stage=on_stage, on_complete=on_complete
+            )
+        )
+    resumed = len(submitted)
+
+    targets = read_targets(args)
+    if not targets and not submitted:
+        emit("error", error="no URLs given")
+        return 2
+
+    failures = 0
+    try:
+        # Extraction runs in the queue's own bounded stage, which resolves
+        # each rule once the formats are known
+        for url, rule in targets:
+            try:
+                job = queue.submit(
+                    url,
+                    None,
+                    on_progress=on_progress,
+                    on_stage=on_stage,
+                    on_complete=on_complete,
+                    quality=rule,
+                )
+            except ValueError as e:
+                failures += 1
+                emit("failed", url=url, error=str(e))
+                continue
+            emit("queued", job=job.id, url=url, quality=rule)
+            if job not in submitted:  # duplicates are joined to the same job
+                submitted.append(job)
+
+        for job in submitted:
+            while not job.wait(0.5):
+                pass
+    except KeyboardInterrupt:
+        queue.shutdown(abort=True)
+        for job in submitted:
+            job.wait(5)
+        emit("interrupted")
+        return 130
+
+    queue.shutdown(abort=False)
+    failures += sum(1 for job in submitted if not job.success)
+    emit("summary", total=len(targets) + resumed, failed=failures)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
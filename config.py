@@ -93,19 +93,130 @@ LOADING = [0, 2, 4, 6, 8, 1, 3, 5, 7]
 DL_FOLDER_NAME = "downloads"
 DL_CONCURRENT_FRAGMENTS = 4
 DL_SPEED_HISTORY_LEN = 20
-DL_SMOOTHING_WINDOW = 10
 DL_SOCKET_TIMEOUT = 30
 DL_RETRIES = 20
 DL_FILE_ACCESS_RETRIES = 5
+DL_URL_REFRESH_RETRIES = 3  # re-extractions per attempt when stream URLs get a 403
 DL_UI_UPDATE_DELAY = 1.5
+DL_FORMAT_POLICY = "copyable"  # best | smallest | copyable | h264
+DL_AUDIO_MODE = "native"  # "native" keeps the source codec, "mp3" converts
 DL_AUDIO_QUALITY = "192"
 DL_AUDIO_BITRATE = "192k"
 DL_HTTP_CHUNK_SIZE = 10485760  # 10MB
+DL_MAX_PARALLEL_JOBS = 3
+DL_PARALLEL_STREAMS = True
+DL_RESUME_ENABLED = True
+DL_JOURNAL_FOLDER_NAME = ".journal"
+DL_JOURNAL_FLUSH_INTERVAL = 2.0
+DL_JOURNAL_MAX_AGE = 7 * 24 * 3600  # 1 week
+
+# --- DOWNLOAD ARCHIVE SETTINGS ---
+ARCHIVE_ENABLED = True
+ARCHIVE_FILE_NAME = ".archive.jsonl"  # inside DL_FOLDER_NAME
+ARCHIVE_SKIP_DUPLICATES = True  # reuse the archived file instead of downloading again
+ARCHIVE_COMPACT_MIN_LINES = 500  # rewrite the file once superseded lines dominate
+
+# --- CONTENT HASHING SETTINGS ---
+HASH_ENABLED = True
+HASH_FAST_CHECKSUM = True  # xxh3_64 with the xxhash package, CRC-32 otherwise
+HASH_READ_CHUNK = 4 * 1024 * 1024  # bytes hashed per read while downloading
+HASH_MANIFEST_FOLDER_NAME = ".manifest"  # inside DL_FOLDER_NAME
+HASH_VERIFY_WORKERS = 4
+
+# --- JOB PIPELINE SETTINGS ---
+PIPELINE_EXTRACT_WORKERS = 2
+PIPELINE_POSTPROCESS_WORKERS = 0  # 0 = one per ffmpeg executor slot
+PIPELINE_DOWNLOAD_BACKLOG = 2  # pre-resolved jobs waiting for a download slot
+PIPELINE_POSTPROCESS_BACKLOG = 4  # downloaded jobs waiting for ffmpeg
+
+# --- PROGRESS ESTIMATOR SETTINGS ---
+PROGRESS_SPEED_HALF_LIFE = 3.0  # seconds for a speed sample to lose half its weight
+PROGRESS_SAMPLE_INTERVAL = 0.5
+PROGRESS_MERGE_RATE = 150 * 1024 * 1024  # initial remux guess, bytes/s
+PROGRESS_TRANSCODE_RATE = 40 * 1024 * 1024  # initial merge + aac re-encode guess
+PROGRESS_AUDIO_RATE = 8 * 1024 * 1024  # initial mp3 conversion guess, bytes/s
+PROGRESS_MERGE_LEARNING_RATE = 0.3
+
+# --- SIZE PROBE SETTINGS ---
+PROBE_ENABLED = True
+PROBE_WAIT = 1.5  # max seconds a download start waits for size probes
+PROBE_TIMEOUT = 5
+PROBE_WORKERS = 4
+
+# --- POST-PROCESSING PLANNER SETTINGS ---
+PP_PREFER_PROGRESSIVE = True  # take a muxed mp4 at the exact height, no merge
+PP_PREFER_COPYABLE_AUDIO = True  # prefer m4a audio so the merge is a stream copy
+
+# --- FFMPEG EXECUTOR SETTINGS ---
+FFMPEG_LOCATION = None  # None = ffmpeg from PATH
+FFMPEG_MAX_PROCS = 0  # 0 = cores // FFMPEG_THREADS_PER_JOB
+FFMPEG_THREADS_PER_JOB = 2  # ffmpeg -threads per job (0 = cores split over 2 jobs)
+FFMPEG_NICE = 10  # niceness of ffmpeg processes (Windows: below normal)
+FFMPEG_NICE_INTERACTIVE = 19  # while the window is in use (Windows: idle)
+FFMPEG_INTERACTIVE_HOLD = 3.0  # seconds after the last input the UI counts as busy
+FFMPEG_STATS_HISTORY = 50  # finished jobs kept for the stats endpoint
+
+# --- STREAM WATCHDOG SETTINGS ---
+WATCHDOG_ENABLED = True  # reconnect streams that are silently throttled
+WATCHDOG_SAMPLE_INTERVAL = 1.0  # seconds between speed samples of a stream
+WATCHDOG_HALF_LIFE = 3.0  # seconds for a speed sample to lose half its weight
+WATCHDOG_BASELINE_WINDOW = 60.0  # baseline = best speed seen in this window
+WATCHDOG_WARMUP = 5.0  # seconds after a (re)connect before a stream is judged
+WATCHDOG_GRACE = 8.0  # seconds a collapse must last before intervening
+WATCHDOG_COLLAPSE_RATIO = 0.2  # slow = below this fraction of the baseline...
+WATCHDOG_EXPECTED_FACTOR = 2.0  # ...and below this multiple of the bitrate
+WATCHDOG_STARVED_RATIO = 0.5  # always slow below this fraction of the bitrate
+WATCHDOG_MAX_RECONNECTS = 2  # per stream, before re-extracting
+WATCHDOG_MAX_REEXTRACTS = 1  # per download
+WATCHDOG_READ_SIZE = 128 * 1024  # fixed read size, so slow streams still report
+WATCHDOG_LOG_FILE = "watchdog.jsonl"  # interventions log, in CACHE_FOLDER_NAME
+
+# --- BANDWIDTH LIMITER SETTINGS ---
+BW_GLOBAL_LIMIT = 0  # bytes/s shared by all jobs, 0 = unlimited
+BW_JOB_LIMIT = 0  # default per-job cap in bytes/s, 0 = fair share only
+BW_BURST_SECONDS = 1.0
+BW_IDLE_AFTER = 2.0
+BW_CHUNK_SIZE = 64 * 1024
+
+# --- NETWORK SESSION SETTINGS ---
+NET_SHARED_SESSION = True  # one keep-alive connection pool for every download
+NET_DNS_CACHE_TTL = 300  # seconds a host lookup is reused, 0 = no cache
+NET_DNS_CACHE_SIZE = 256
+NET_PREWARM = True  # connect to the media host while a quality is picked
+NET_PREWARM_INTERVAL = 30.0  # min seconds between warm-ups of one host
+NET_PREWARM_TIMEOUT = 5
+
+# --- EXTRACTION ENGINE SETTINGS ---
+EXTRACT_POOL_SIZE = 2
+
+# --- METADATA CACHE SETTINGS ---
+CACHE_FOLDER_NAME = "cache"
+META_CACHE_TTL = 7 * 24 * 3600  # 1 week
+META_CACHE_MAX_ENTRIES = 500
+META_CACHE_MAX_BYTES = 64 * 1024 * 1024  # 64MB
+META_CACHE_URL_EXPIRY_MARGIN = 15 * 60
+
+# --- PLAYER CACHE SETTINGS ---
+PLAYER_CACHE_ENABLED = True  # yt-dlp cache in cache/yt-dlp instead of ~/.cache
+PLAYER_CACHE_MAX_BYTES = 64 * 1024 * 1024  # 64MB
+PLAYER_CACHE_PREWARM = True  # fetch the current player at startup
 
 # --- THROTTLING SETTINGS ---
 THROTTLE_RETRY_DELAY = 60
 THROTTLE_MAX_RETRIES = 3
 THROTTLE_BACKOFF_MULTIPLIER = 2
+THROTTLE_MAX_DELAY = 300
+THROTTLE_CIRCUIT_THRESHOLD = 5
+THROTTLE_CIRCUIT_COOLDOWN = 900
+THROTTLE_STATE_TTL = 6 * 3600
+
+# --- LOCAL JOB API SETTINGS ---
+API_ENABLED = False
+API_HOST = "127.0.0.1"
+API_PORT = 8765
+API_EVENT_BUFFER = 2048
+API_HEARTBEAT_INTERVAL = 15.0
+API_PROGRESS_MIN_INTERVAL = 0.25  # per-job SSE progress rate cap
 
 # ============================================================================
 # CHECKER & UPDATER SETTINGS
@@ -0,0 +1,128 @@
+"""
+0xDownloader - Extraction engine
+
+Keeps a small pool of warm in-process yt_dlp.YoutubeDL instances alive for the
+whole app session, so metadata extraction skips interpreter startup, yt-dlp import
+and extractor initialization, and never serializes the info dict through a pipe.
+"""
+
+import queue
+import threading
+
+import yt_dlp
+
+import config as cfg
+from modules.player_cache import player_cache
+
+
+class ExtractionEngine:
+    """Pool of reusable YoutubeDL instances dedicated to metadata extraction"""
+
+    def __init__(self, pool_size=cfg.EXTRACT_POOL_SIZE):
+        self.pool_size = max(1, int(pool_size))
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def base_options(self):
+        return {
+            "quiet": True,
+            "no_warnings": True,
+            "skip_download": True,
+            "noplaylist": True,
+            "nocheckcertificate": True,
+            "geo_bypass": True,
+            "socket_timeout": cfg.DL_SOCKET_TIMEOUT,
+            "retries": cfg.DL_RETRIES,
+            **player_cache.options(),
+        }
+
+    # --- pool handling ---
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._created < self.pool_size:
+                self._created += 1
+                try:
+                    return self._new_instance()
+                except Exception:
+                    # Free the slot, or later calls wait for an instance
+                    # that will never exist
+                    self._created -= 1
+                    raise
+
+        return self._idle.get()
+
+    def _release(self, ydl):
+        if self._closed:
+            ydl.close()
+            return
+        self._idle.put(ydl)
+
+    def _new_instance(self):
+        ydl = yt_dlp.YoutubeDL(self.base_options())
+        # Instantiate the YouTube extractor up front so the first call is warm
+        ydl.get_info_extractor("Youtube")
+        player_cache.attach(ydl)
+        return ydl
+
+    # --- public API ---
+
+    def extract(self, url):
+        """Extract url and return a JSON-safe info dict (same shape as --dump-json)"""
+        ydl = self._acquire()
+        try:
+            info = ydl.extract_info(url, download=False)
+            return yt_dlp.YoutubeDL.sanitize_info(info, True)
+        finally:
+            self._release(ydl)
+
+    def warm_up(self, background=True):
+        """Pre-create one instance so the first analysis doesn't pay for it.
+
+        With PLAYER_CACHE_PREWARM the current YouTube player is loaded into it
+        as well, so the first signature deciphering starts warm too.
+        """
+
+        def _task():
+            try:
+                ydl = self._acquire()
+                try:
+                    if cfg.PLAYER_CACHE_PREWARM:
+                        player_cache.prewarm(ydl)
+                finally:
+                    self._release(ydl)
+            except Exception as e:
+                print(f"[WARNING] Extraction engine warm-up failed: {e}")
+
+        if background:
+            threading.Thread(target=_task, name="engine-warmup", daemon=True).start()
+        else:
+            _task()
+
+    def close(self):
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    """Process-wide ExtractionEngine singleton"""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = ExtractionEngine()
+        return _engine
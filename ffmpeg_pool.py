@@ -0,0 +1,287 @@
+"""
+0xDownloader - ffmpeg executor
+
+Runs the post-processing ffmpeg commands (merge, remux, audio extraction) as a
+bounded pool of child processes sized to the available cores, each with its own
+-threads budget and a lowered scheduling priority that drops further while the
+Tk window is being used. Keeps queue depth and per-job CPU time for sizing.
+"""
+
+import collections
+import os
+import shutil
+import subprocess
+import threading
+import time
+
+import config as cfg
+
+if os.name == "nt":
+    import ctypes
+    from ctypes import wintypes
+
+    _PRIORITY_CLASSES = (
+        (15, 0x00000040),  # IDLE_PRIORITY_CLASS
+        (1, 0x00004000),  # BELOW_NORMAL_PRIORITY_CLASS
+        (0, 0x00000020),  # NORMAL_PRIORITY_CLASS
+    )
+
+
+class FFmpegError(Exception):
+    """ffmpeg could not be started, failed, or was aborted"""
+
+
+def _ffmpeg_executable():
+    location = cfg.FFMPEG_LOCATION or shutil.which("ffmpeg")
+    if not location:
+        raise FFmpegError("ffmpeg not found: add it to PATH or set FFMPEG_LOCATION")
+    return location
+
+
+# ============================================================================
+# PLATFORM HELPERS
+# ============================================================================
+
+
+def _set_priority(process, nice):
+    """Best effort: Unix cannot lower a niceness again without privileges"""
+    try:
+        if os.name == "nt":
+            cls = next(c for threshold, c in _PRIORITY_CLASSES if nice >= threshold)
+            ctypes.windll.kernel32.SetPriorityClass(int(process._handle), cls)
+        else:
+            os.setpriority(os.PRIO_PROCESS, process.pid, nice)
+        return True
+    except (OSError, AttributeError, StopIteration):
+        return False
+
+
+def _windows_cpu_time(process):
+    times = [wintypes.FILETIME() for _ in range(4)]
+    ok = ctypes.windll.kernel32.GetProcessTimes(
+        int(process._handle), *[ctypes.byref(t) for t in times]
+    )
+    if not ok:
+        return None
+    kernel, user = times[2], times[3]
+    ticks = sum((t.dwHighDateTime << 32) + t.dwLowDateTime for t in (kernel, user))
+    return ticks / 10_000_000
+
+
+def _drain(stream, tail):
+    """Read stream to EOF so ffmpeg never blocks on a full stderr pipe"""
+    try:
+        for line in stream:
+            tail.append(line.decode("utf-8", "replace"))
+    except (OSError, ValueError):
+        pass
+
+
+def _wait(process, check_abort, poll=0.2):
+    """Wait for process; returns (returncode, cpu seconds or None)"""
+    while True:
+        if check_abort and check_abort():
+            process.kill()
+            process.wait()
+            raise FFmpegError("Aborted by user")
+
+        if os.name == "nt":
+            try:
+                process.wait(timeout=poll)
+            except subprocess.TimeoutExpired:
+                continue
+            return process.returncode, _windows_cpu_time(process)
+
+        # wait4 reaps the child and reports its own rusage
+        pid, status, usage = os.wait4(process.pid, os.WNOHANG)
+        if pid:
+            process.returncode = os.waitstatus_to_exitcode(status)
+            return process.returncode, usage.ru_utime + usage.ru_stime
+        time.sleep(poll)
+
+
+# ============================================================================
+# EXECUTOR
+# ============================================================================
+
+
+class FFmpegExecutor:
+    """Bounded pool of ffmpeg processes with per-job threads and priority"""
+
+    def __init__(self, max_procs=None, threads_per_job=None):
+        cores = os.cpu_count() or 2
+        self.threads_per_job = threads_per_job or cfg.FFMPEG_THREADS_PER_JOB or max(
+            1, cores // max(1, max_procs or cfg.FFMPEG_MAX_PROCS or 2)
+        )
+        self.max_procs = max_procs or cfg.FFMPEG_MAX_PROCS or max(
+            1, cores // self.threads_per_job
+        )
+        self._slots = threading.BoundedSemaphore(self.max_procs)
+        self._lock = threading.Lock()
+        self._running = {}
+        self._queued = 0
+        self._completed = 0
+        self._cpu_total = 0.0
+        self._recent = collections.deque(maxlen=cfg.FFMPEG_STATS_HISTORY)
+        self._interactive_until = 0.0
+        self._current_nice = cfg.FFMPEG_NICE
+        self._monitor = None
+
+    # --- UI interactivity ---
+
+    def note_interaction(self):
+        """Called by the UI on user input: ffmpeg yields the CPU for a while"""
+        self._interactive_until = time.monotonic() + cfg.FFMPEG_INTERACTIVE_HOLD
+
+    @property
+    def interactive(self):
+        return time.monotonic() < self._interactive_until
+
+    def _target_nice(self):
+        return cfg.FFMPEG_NICE_INTERACTIVE if self.interactive else cfg.FFMPEG_NICE
+
+    def _monitor_loop(self):
+        while True:
+            with self._lock:
+                if not self._running:
+                    self._monitor = None
+                    return
+                processes = [entry["process"] for entry in self._running.values()]
+                nice = self._target_nice()
+                changed = nice != self._current_nice
+                self._current_nice = nice
+            if changed:
+                for process in processes:
+                    _set_priority(process, nice)
+            time.sleep(0.5)
+
+    # --- running ---
+
+    def run(self, inputs, options, output, check_abort=None, label=None):
+        """Run ffmpeg -i inputs... options output; returns (wall, cpu) seconds.
+
+        Blocks while all slots are busy. The output is written to a temporary
+        name and only moved into place when ffmpeg succeeds.
+        """
+        executable = _ffmpeg_executable()
+        root, ext = os.path.splitext(output)
+        temp_output = f"{root}.temp{ext}"
+
+        cmd = [executable, "-y", "-nostdin", "-loglevel", "error"]
+        for path in inputs:
+            cmd += ["-i", path]
+        cmd += list(options) + ["-threads", str(self.threads_per_job), temp_output]
+
+        with self._lock:
+            self._queued += 1
+        try:
+            while not self._slots.acquire(timeout=0.2):
+                if check_abort and check_abort():
+                    raise FFmpegError("Aborted by user")
+        finally:
+            with self._lock:
+                self._queued -= 1
+
+        try:
+            return self._run_in_slot(cmd, temp_output, output, check_abort, label)
+        finally:
+            self._slots.release()
+
+    def _run_in_slot(self, cmd, temp_output, output, check_abort, label):
+        start = time.monotonic()
+        kwargs = {}
+        if os.name == "nt":
+            kwargs["creationflags"] = subprocess.CREATE_NO_WINDOW
+        try:
+            process = subprocess.Popen(
+                cmd,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
+                **kwargs,
+            )
+        except OSError as e:
+            raise FFmpegError(f"ffmpeg could not be started: {e}")
+
+        with self._lock:
+            _set_priority(process, self._target_nice())
+            self._running[process.pid] = {"process": process, "label": label}
+            if self._monitor is None:
+                self._monitor = threading.Thread(
+                    target=self._monitor_loop, name="ffmpeg-monitor", daemon=True
+                )
+                self._monitor.start()
+
+        # stderr is drained while ffmpeg runs; only its last lines are kept
+        tail = collections.deque(maxlen=20)
+        reader = threading.Thread(
+            target=_drain,
+            args=(process.stderr, tail),
+            name="ffmpeg-stderr",
+            daemon=True,
+        )
+        reader.start()
+        try:
+            returncode, cpu = _wait(process, check_abort)
+        except FFmpegError:
+            _remove(temp_output)
+            raise
+        finally:
+            reader.join(5)
+            process.stderr.close()
+            with self._lock:
+                self._running.pop(process.pid, None)
+
+        wall = time.monotonic() - start
+        if returncode != 0:
+            _remove(temp_output)
+            lines = [line.strip() for line in tail if line.strip()]
+            last_line = lines[-1] if lines else f"exit code {returncode}"
+            raise FFmpegError(f"ffmpeg failed: {last_line}")
+
+        os.replace(temp_output, output)
+        with self._lock:
+            self._completed += 1
+            self._cpu_total += cpu or 0.0
+            self._recent.append(
+                {
+                    "label": label,
+                    "wall": round(wall, 3),
+                    "cpu": round(cpu, 3) if cpu is not None else None,
+                    "threads": self.threads_per_job,
+                }
+            )
+        return wall, cpu
+
+    def stats(self):
+        with self._lock:
+            return {
+                "max_procs": self.max_procs,
+                "threads_per_job": self.threads_per_job,
+                "running": len(self._running),
+                "queued": self._queued,
+                "completed": self._completed,
+                "cpu_seconds_total": round(self._cpu_total, 3),
+                "interactive": self.interactive,
+                "recent": list(self._recent),
+            }
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Process-wide FFmpegExecutor singleton"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = FFmpegExecutor()
+        return _executor
@@ -0,0 +1,189 @@
+"""
+0xDownloader - Content hashing
+
+Integrity records for finished downloads: SHA-256 plus an optional fast checksum
+(xxh3_64 when the xxhash package is installed, CRC-32 otherwise). Files that
+are downloaded straight to their final name are hashed incrementally while they
+are written, reading only the newly appended bytes from the page cache. ffmpeg
+outputs are not: mp4 muxing seeks back into the file (+faststart moves the moov
+atom), so a merged or transcoded file is hashed after the fact with one full
+read, and its manifest says so ("hashed": "after_write" instead of "while_writing").
+Digests go to one JSON manifest per file, which can be verified later on a
+thread pool.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+import config as cfg
+
+try:
+    import xxhash
+except ImportError:  # optional: CRC-32 is used as the fast checksum instead
+    xxhash = None
+
+FAST_ALGORITHM = "xxh3_64" if xxhash else "crc32"
+
+# How a manifest's digests were obtained
+HASHED_WHILE_WRITING = "while_writing"
+HASHED_AFTER_WRITE = "after_write"
+
+
+# ============================================================================
+# HASHERS
+# ============================================================================
+
+
+class ContentHasher:
+    """SHA-256 and fast checksum of a byte stream fed in order"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.position = 0
+        self._sha256 = hashlib.sha256()
+        self._xxh = xxhash.xxh3_64() if xxhash else None
+        self._crc = 0
+
+    def update(self, data):
+        self._sha256.update(data)
+        if cfg.HASH_FAST_CHECKSUM:
+            if self._xxh is not None:
+                self._xxh.update(data)
+            else:
+                self._crc = zlib.crc32(data, self._crc)
+        self.position += len(data)
+
+    def digests(self):
+        result = {"sha256": self._sha256.hexdigest()}
+        if cfg.HASH_FAST_CHECKSUM:
+            result[FAST_ALGORITHM] = (
+                self._xxh.hexdigest() if self._xxh is not None else f"{self._crc:08x}"
+            )
+        return result
+
+
+class TailHasher(ContentHasher):
+    """Hashes a file while another writer appends to it.
+
+    feed(path, upto) hashes the bytes between the last position and upto,
+    which were just written and still sit in the page cache. The file is only
+    opened for the read, so the writer can rename it (.part -> final) at any
+    time. A file that shrank (restarted download) is hashed from scratch.
+    """
+
+    def feed(self, path, upto, force=False):
+        if upto < self.position:
+            self.reset()
+        if not force and upto - self.position < cfg.HASH_READ_CHUNK:
+            return
+        try:
+            with open(path, "rb") as f:
+                f.seek(self.position)
+                while self.position < upto:
+                    data = f.read(min(cfg.HASH_READ_CHUNK, upto - self.position))
+                    if not data:
+                        break
+                    self.update(data)
+        except OSError:
+            pass
+
+
+def hash_file(path):
+    """Digests of a whole file (one sequential read)"""
+    hasher = ContentHasher()
+    with open(path, "rb") as f:
+        while True:
+            data = f.read(cfg.HASH_READ_CHUNK)
+            if not data:
+                break
+            hasher.update(data)
+    return hasher.digests()
+
+
+# ============================================================================
+# MANIFEST
+# ============================================================================
+
+
+class Manifest:
+    """One JSON record per downloaded file under <downloads>/.manifest"""
+
+    def __init__(self, folder=None):
+        self.folder = folder or os.path.join(
+            os.getcwd(), cfg.DL_FOLDER_NAME, cfg.HASH_MANIFEST_FOLDER_NAME
+        )
+        self._lock = threading.Lock()
+
+    def _path(self, filename):
+        return os.path.join(self.folder, f"{filename}.json")
+
+    def load(self, filename):
+        try:
+            with open(self._path(filename), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def write(self, path, digests, hashed=HASHED_WHILE_WRITING):
+        record = {
+            "file": os.path.basename(path),
+            "size": os.path.getsize(path),
+            "created_at": time.time(),
+            "hashed": hashed,
+            **digests,
+        }
+        with self._lock:
+            try:
+                os.makedirs(self.folder, exist_ok=True)
+                tmp_path = self._path(record["file"]) + ".tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(record, f)
+                os.replace(tmp_path, self._path(record["file"]))
+            except OSError as e:
+                print(f"[WARNING] Manifest write failed: {e}")
+        return record
+
+    def records(self):
+        if not os.path.isdir(self.folder):
+            return []
+        names = [n[:-5] for n in os.listdir(self.folder) if n.endswith(".json")]
+        return [r for r in map(self.load, names) if r]
+
+    def verify(self, workers=cfg.HASH_VERIFY_WORKERS):
+        """Check every manifested file; returns one result dict per file.
+
+        status is "ok", "missing" or "mismatch". Size mismatches are reported
+        without reading the file; the rest are hashed in parallel (hashlib
+        releases the GIL on large buffers).
+        """
+        download_path = os.path.dirname(self.folder)
+
+        def check(record):
+            path = os.path.join(download_path, record["file"])
+            result = {"file": record["file"], "status": "ok"}
+            try:
+                if os.path.getsize(path) != record["size"]:
+                    result["status"] = "mismatch"
+                    return result
+                actual = hash_file(path)["sha256"]
+            except OSError:
+                result["status"] = "missing"
+                return result
+            if actual != record["sha256"]:
+                result.update(
+                    status="mismatch", expected=record["sha256"], actual=actual
+                )
+            return result
+
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            return list(pool.map(check, self.records()))
+
+
+manifest = Manifest()
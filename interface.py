@@ -17,9 +17,17 @@ import math
 
 import config as cfg
 import utils
-import logic
+import jobs
+from api import start_api
+from planner import native_audio_ext
+from sessions import sessions
+from archive import archive
+from engine import get_engine
+from ffmpeg_pool import get_executor
+from journal import journal
+from throttle import get_controller, detect_throttling, host_key
 
-from modules.youtube import YouTubeVideoHandler
+from modules.youtube import YouTubeVideoHandler, extract_video_id
 
 
 class OxUI:
@@ -73,6 +81,9 @@ class OxUI:
         self.abort_pressed_small = False
 
         self.handler = None
+        self.download_queue = jobs.DownloadQueue()
+        self.current_job = None
+        self.api_server = None
         self.menu_canvas = None
         self.menu_buttons = []
 
@@ -138,6 +149,18 @@ class OxUI:
         self.validate_ui_state()
         self.url_var.trace_add("write", self.on_url_change)
 
+        # ffmpeg steps back while the window is being used
+        for sequence in ("<Motion>", "<Any-KeyPress>", "<Any-ButtonPress>"):
+            self.root.bind_all(sequence, self.on_user_activity, add="+")
+
+        get_engine().warm_up()
+        if cfg.API_ENABLED:
+            self.api_server = start_api(self.download_queue)
+
+        pending = journal.pending() if cfg.DL_RESUME_ENABLED else []
+        if pending:
+            print(f"[INFO] {len(pending)} interrupted download(s) can be resumed - paste the link again")
+
         self.run_animation_loop()
         print("SYSTEM ONLINE - Waiting for link...")
 
@@ -836,6 +859,22 @@ class OxUI:
                 self.is_error_state = False
             self.check_url_theme()
             self.validate_ui_state()
+            if self.is_url_valid:
+                self.show_archive_hint(current_text.strip())
+
+    def show_archive_hint(self, url):
+        """Tell the user when this video is already in the download archive"""
+        if not cfg.ARCHIVE_ENABLED:
+            return
+        archived = archive.find(extract_video_id(url))
+        if archived:
+            qualities = ", ".join(sorted({r["resolution"] for r in archived}))
+            self.canvas.itemconfig(
+                self.ids["error_text"],
+                text=f"✔ Already downloaded ({qualities})",
+                fill=cfg.COLOR_SUCCESS,
+                state="normal",
+            )
 
     def validate_ui_state(self):
         url = self.url_var.get().strip()
@@ -1096,6 +1135,12 @@ class OxUI:
         self.pause_requested = not self.pause_requested
         self.is_paused = self.pause_requested
 
+        if self.current_job:
+            if self.pause_requested:
+                self.current_job.pause()
+            else:
+                self.current_job.resume()
+
         # Color & Icon update handled in animation loop
         if self.is_paused:
             print("[INFO] Download paused")
@@ -1142,6 +1187,8 @@ class OxUI:
             self.abort_requested = True
             self.pause_requested = False
             self.is_paused = False
+            if self.current_job:
+                self.current_job.abort()
             print("[ABORT] ABORTED BY USER")
 
             # bring back main button immediately (like old behavior)
@@ -1189,17 +1236,23 @@ class OxUI:
     def on_background_click(self, event=None):
         self.root.focus()
 
+    def on_user_activity(self, event=None):
+        get_executor().note_interaction()
+
     # ============================================================================
     # WINDOW CLOSE
     # ============================================================================
 
     def on_closing(self):
+        if self.api_server:
+            self.api_server.stop()
         if self.is_downloading:
             if not self.abort_requested:
                 self.abort_requested = True
                 self.pause_requested = False
                 self.is_paused = False
                 print("[ABORT] ABORTED BY USER - Closing")
+            self.download_queue.shutdown()
             self.root.destroy()
             sys.exit()
         self.root.destroy()
@@ -1252,10 +1305,21 @@ class OxUI:
 
         print("Fetching link...")
 
+        controller = get_controller()
+        host = host_key(url)
+        pending_wait = controller.wait_time(host)
+        if pending_wait > 0:
+            # A previous run/analysis is still backing off from this host
+            print("[WARNING] YouTube throttling detected - retrying later...")
+            self.on_throttling_detected(pending_wait)
+            return
+
         def task():
             try:
                 self.handler = YouTubeVideoHandler(url)
                 res_list, title = self.handler.fetch_info()
+                if self.handler.from_cache:
+                    print("[INFO] Metadata loaded from cache")
 
                 info = self.handler.video_info
                 audio_formats = [
@@ -1271,7 +1335,9 @@ class OxUI:
 
                 audio_label = "Audio Only"
                 if best_audio:
-                    ext = best_audio.get("ext", "mp3")
+                    ext = "mp3"
+                    if cfg.DL_AUDIO_MODE == "native":
+                        ext = native_audio_ext(best_audio) or "mp3"
                     abr = best_audio.get("abr")
                     audio_label = f"Audio {ext} {int(abr)}k" if abr else f"Audio {ext}"
 
@@ -1280,26 +1346,23 @@ class OxUI:
                     res_list.append(audio_label)
 
                 self.resolutions = res_list
+                controller.record_success(host)
 
                 print(f"FOUND: {title}")
                 self.root.after(0, self.show_custom_menu)
 
             except Exception as e:
-                error_msg = str(e).lower()
-                if (
-                    "throttling" in error_msg
-                    or "429" in error_msg
-                    or "rate limit" in error_msg
-                ):
+                if detect_throttling(e):
+                    delay = controller.record_throttle(host)
                     print("[WARNING] YouTube throttling detected - retrying later...")
-                    self.root.after(0, self.on_throttling_detected)
+                    self.root.after(0, lambda: self.on_throttling_detected(delay))
                 else:
                     print(f"[ERROR] CRITICAL ERROR: {e}")
                     self.root.after(0, self.on_analysis_error)
 
         threading.Thread(target=task, daemon=True).start()
 
-    def on_throttling_detected(self):
+    def on_throttling_detected(self, delay=cfg.THROTTLE_RETRY_DELAY):
         self.is_throttled = True
         self.is_analyzing = False
         self.set_input_state(True)
@@ -1307,9 +1370,13 @@ class OxUI:
         self.target_btn_color = cfg.COLOR_WARNING
         self.target_btn_text_color = cfg.COLOR_TEXT_DARK
         self.draw_ring()
+        print(f"[INFO] Next attempt in {int(delay)}s")
 
         def retry():
-            time.sleep(cfg.THROTTLE_RETRY_DELAY)
+            get_controller().wait_until_allowed(
+                host_key(self.url_var.get().strip()),
+                check_abort=lambda: not self.is_throttled,
+            )
             if self.is_throttled:
                 print("[INFO] Retrying after throttling delay...")
                 self.is_throttled = False
@@ -1335,6 +1402,13 @@ class OxUI:
         self.is_menu_open = True
         self.is_analyzing = False
 
+        # Connect to the media host while the user is still choosing
+        if self.handler and not self.handler.urls_expired:
+            sessions.prewarm_video(
+                self.handler.video_info,
+                next(iter(self.handler.formats_map.values()), None),
+            )
+
         self.canvas.itemconfig(self.ids["btn_text"], text="✓ READY")
         self.target_btn_color = cfg.COLOR_SUCCESS
         self.target_btn_text_color = cfg.COLOR_TEXT_WHITE
@@ -1531,43 +1605,46 @@ class OxUI:
 
         print(f"[INFO] Starting download: {resolution}")
 
-        def progress_cb(progress, speed, eta, size):
+        def progress_cb(job, progress, speed, eta, size):
+            if job is not self.current_job:
+                return
             self.progress_target = progress
             self.display_speed = speed
             self.display_eta = eta
             self.display_data = size
 
-        def stage_cb(stage):
-            if stage == "merging":
-                self.is_merging = True
-                # During merging keep original UI behavior (single disabled button)
-                self._set_split_controls_visible(False)
-                self.canvas.itemconfig(self.ids["btn_text"], text="⚙️ MERGING")
-                self.target_btn_color = "#222222"
-                self.target_btn_text_color = "#888888"
-
-        def check_abort_cb():
-            return self.abort_requested
-
-        def check_pause_cb():
-            return self.pause_requested
-
-        callbacks = {
-            "progress": progress_cb,
-            "stage": stage_cb,
-            "check_abort": check_abort_cb,
-            "check_pause": check_pause_cb,
-        }
+        def stage_cb(job, stage):
+            if stage == jobs.STATE_MERGING:
+                self.root.after(0, lambda: self.on_job_merging(job))
 
-        def _download_task():
-            success, final_file = logic.run_download(
-                url, resolution, self.handler, callbacks
+        def complete_cb(job):
+            self.root.after(
+                0, lambda: self.on_download_complete(job.success, job.final_file, job)
             )
-            self.root.after(0, lambda: self.on_download_complete(success, final_file))
 
-        threading.Thread(target=_download_task, daemon=True).start()
+        self.current_job = self.download_queue.submit(
+            url,
+            resolution,
+            handler=self.handler,
+            on_progress=progress_cb,
+            on_stage=stage_cb,
+            on_complete=complete_cb,
+        )
+
+    def on_job_merging(self, job):
+        if job is not self.current_job:
+            return
+        self.is_merging = True
+        # During merging keep original UI behavior (single disabled button)
+        self._set_split_controls_visible(False)
+        self.canvas.itemconfig(self.ids["btn_text"], text="⚙️ MERGING")
+        self.target_btn_color = "#222222"
+        self.target_btn_text_color = "#888888"
 
-    def on_download_complete(self, success, final_file):
+    def on_download_complete(self, success, final_file, job=None):
+        if job is not None and job is not self.current_job:
+            return
+        self.current_job = None
         self.is_downloading = False
         self.is_merging = False
         self.is_paused = False
@@ -1598,7 +1675,8 @@ class OxUI:
                 self.is_aborted_state = True
                 self.progress_current = 100.0
                 print("[WARNING] Download was aborted.")
-                utils.perform_cleanup(final_file)
+                if not cfg.DL_RESUME_ENABLED:
+                    utils.perform_cleanup(final_file)
 
                 self.reset_info_labels()
                 self.set_input_state(True)
@@ -0,0 +1,544 @@
+"""
+0xDownloader - Download job queue
+
+Handles queuing of download jobs as a staged pipeline (extraction, download,
+post-processing) with a worker pool and a bounded hand-off queue per stage,
+per-job state tracking and per-job callbacks.
+"""
+
+import itertools
+import math
+import queue
+import re
+import threading
+import time
+
+import config as cfg
+import logic
+from ffmpeg_pool import get_executor
+from journal import journal
+from throttle import get_controller
+from bandwidth import limiter
+from modules.youtube import YouTubeVideoHandler, extract_video_id
+
+# ============================================================================
+# JOB STATES
+# ============================================================================
+
+STATE_QUEUED = "queued"
+STATE_EXTRACTING = "extracting"
+STATE_DOWNLOADING = "downloading"
+STATE_MERGING = "merging"
+STATE_DONE = "done"
+STATE_FAILED = "failed"
+
+FINAL_STATES = (STATE_DONE, STATE_FAILED)
+
+
+def pick_resolution(resolutions, rule):
+    """Map a quality rule onto the labels offered by YouTubeVideoHandler.
+
+    Rules: best | worst | audio | <H>p (exact, else closest below) | <=<H>
+    """
+    rule = (rule or "best").lower().strip()
+    if rule == "audio":
+        return "Audio Only"
+
+    heights = sorted(
+        (int(r[:-1]) for r in resolutions if re.fullmatch(r"\d+p", r)), reverse=True
+    )
+    if not heights:
+        raise ValueError("No video formats to pick a resolution from")
+    if rule == "best":
+        return f"{heights[0]}p"
+    if rule == "worst":
+        return f"{heights[-1]}p"
+
+    match = re.fullmatch(r"(<=)?(\d{3,4})p?", rule)
+    if not match:
+        raise ValueError(f"Unknown quality rule: {rule}")
+    target = int(match.group(2))
+    below = [h for h in heights if h <= target]
+    if below:
+        return f"{below[0]}p"
+    if match.group(1):
+        raise ValueError(f"No format at or below {target}p")
+    return f"{heights[-1]}p"
+
+
+QUALITY_RULE_RE = re.compile(r"best|worst|audio|(<=)?\d{3,4}p?")
+RESOLUTION_RE = re.compile(r"\d{3,4}p|4k|hd|best|audio.*", re.IGNORECASE)
+
+
+def validate_request(resolution, quality, rate_limit):
+    """(resolution, quality, rate_limit) of a valid submission, normalized.
+
+    resolution comes back as a label run_download understands: "audio ..."
+    becomes "Audio Only", and "best" is turned into the quality rule so the
+    extract stage picks the highest height offered. rate_limit is bytes/s or
+    None. Raises ValueError for a resolution, quality rule or rate_limit that
+    run_download or the limiter would only fail on once the job exists.
+    """
+    if resolution is not None:
+        if not (
+            isinstance(resolution, str)
+            and RESOLUTION_RE.fullmatch(resolution.strip())
+        ):
+            raise ValueError(f"Unknown resolution: {resolution!r}")
+        resolution = resolution.strip().lower()
+        if resolution.startswith("audio"):
+            resolution = "Audio Only"
+        elif resolution == "best":
+            resolution, quality = None, "best"
+    if quality is not None:
+        if not (
+            isinstance(quality, str)
+            and QUALITY_RULE_RE.fullmatch(quality.lower().strip())
+        ):
+            raise ValueError(f"Unknown quality rule: {quality!r}")
+        quality = quality.lower().strip()
+    return resolution, quality, _validate_rate_limit(rate_limit)
+
+
+def _validate_rate_limit(rate_limit):
+    if rate_limit is None or rate_limit == 0:
+        return None
+    if isinstance(rate_limit, bool):
+        raise ValueError("rate_limit must be a number of bytes/s")
+    try:
+        rate_limit = float(rate_limit)
+    except (TypeError, ValueError):
+        raise ValueError("rate_limit must be a number of bytes/s") from None
+    if not math.isfinite(rate_limit) or rate_limit < 0:
+        raise ValueError("rate_limit must be a positive number of bytes/s")
+    return rate_limit or None
+
+
+# ============================================================================
+# DOWNLOAD JOB
+# ============================================================================
+
+
+class DownloadJob:
+    """A single URL/resolution request and its live state"""
+
+    _ids = itertools.count(1)
+
+    def __init__(
+        self,
+        url,
+        resolution,
+        handler=None,
+        on_progress=None,
+        on_stage=None,
+        on_complete=None,
+        quality=None,
+        listeners=(),
+    ):
+        self.id = next(self._ids)
+        self.url = url
+        self.resolution = resolution
+        self.quality = quality
+        self.handler = handler
+
+        self.on_progress = on_progress
+        self.on_stage = on_stage
+        self.on_complete = on_complete
+        self.listeners = listeners
+        self.followers = []
+        self.target = None
+        self.postprocess_step = None
+
+        self.state = STATE_QUEUED
+        self.progress = 0.0
+        self.speed = "-- MB/s"
+        self.eta = "--:--"
+        self.size = "---"
+        self.success = False
+        self.final_file = None
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+
+        self._abort_event = threading.Event()
+        self._pause_event = threading.Event()
+        self._done_event = threading.Event()
+
+    # --- controls ---
+
+    def abort(self):
+        self._pause_event.clear()
+        self._abort_event.set()
+
+    def pause(self):
+        if self.state not in FINAL_STATES:
+            self._pause_event.set()
+            self._notify("paused")
+
+    def resume(self):
+        if self._pause_event.is_set():
+            self._pause_event.clear()
+            self._notify("resumed")
+
+    def follow(self, on_progress=None, on_stage=None, on_complete=None):
+        """Also report to the callbacks of a duplicate request joined to this job"""
+        callbacks = (on_progress, on_stage, on_complete)
+        own = (self.on_progress, self.on_stage, self.on_complete)
+        if any(callbacks) and callbacks != own and callbacks not in self.followers:
+            self.followers.append(callbacks)
+
+    def set_rate_limit(self, bytes_per_sec):
+        """Cap this job's throughput at runtime (0 = fair share only)"""
+        limiter.set_job_limit(self.id, bytes_per_sec)
+
+    @property
+    def is_aborted(self):
+        return self._abort_event.is_set()
+
+    @property
+    def is_paused(self):
+        return self._pause_event.is_set()
+
+    @property
+    def is_finished(self):
+        return self.state in FINAL_STATES
+
+    def wait(self, timeout=None):
+        """Block until the job reaches a final state"""
+        return self._done_event.wait(timeout)
+
+    # --- state handling ---
+
+    def _notify(self, event):
+        for listener in self.listeners:
+            try:
+                listener(event, self)
+            except Exception as e:
+                print(f"[WARNING] Job listener failed: {e}")
+
+    def set_state(self, state):
+        if self.state == state:
+            return
+        self.state = state
+        for on_stage in self._callbacks(1):
+            on_stage(self, state)
+        self._notify("state")
+
+    def _report_progress(self, progress, speed, eta, size):
+        self.progress = progress
+        self.speed = speed
+        self.eta = eta
+        self.size = size
+        for on_progress in self._callbacks(0):
+            on_progress(self, progress, speed, eta, size)
+        self._notify("progress")
+
+    def _report_stage(self, stage):
+        if stage in (STATE_EXTRACTING, STATE_DOWNLOADING, STATE_MERGING):
+            self.set_state(stage)
+
+    def _finish(self, success, final_file, error=None):
+        self.success = success
+        self.final_file = final_file
+        self.error = error
+        self.finished_at = time.time()
+        self.set_state(STATE_DONE if success else STATE_FAILED)
+        self._done_event.set()
+        for on_complete in self._callbacks(2):
+            on_complete(self)
+
+    def _callbacks(self, index):
+        own = (self.on_progress, self.on_stage, self.on_complete)[index]
+        callbacks = [own] + [f[index] for f in self.followers]
+        return [c for c in callbacks if c]
+
+    def callbacks(self):
+        """Callbacks dict in the shape logic.run_download expects"""
+        return {
+            "job_id": self.id,
+            "progress": self._report_progress,
+            "stage": self._report_stage,
+            "check_abort": lambda: self._abort_event.is_set(),
+            "check_pause": lambda: self._pause_event.is_set(),
+        }
+
+    def snapshot(self):
+        return {
+            "id": self.id,
+            "url": self.url,
+            "resolution": self.resolution,
+            "quality": self.quality,
+            "state": self.state,
+            "progress": self.progress,
+            "speed": self.speed,
+            "eta": self.eta,
+            "size": self.size,
+            "paused": self.is_paused,
+            "final_file": self.final_file,
+            "error": self.error,
+        }
+
+
+# ============================================================================
+# DOWNLOAD QUEUE
+# ============================================================================
+
+
+class DownloadQueue:
+    """FIFO job queue served by a three-stage pipeline of worker pools.
+
+    Extraction workers pre-resolve the metadata of the next queued jobs,
+    download workers keep the network busy and post-processing workers run
+    the ffmpeg merges, so a merge never leaves the network idle. The queues
+    between stages are bounded, which caps how far extraction runs ahead and
+    keeps memory flat on long queues.
+    """
+
+    def __init__(
+        self,
+        max_workers=cfg.DL_MAX_PARALLEL_JOBS,
+        extract_workers=cfg.PIPELINE_EXTRACT_WORKERS,
+        postprocess_workers=cfg.PIPELINE_POSTPROCESS_WORKERS,
+    ):
+        self.max_workers = max(1, int(max_workers))
+        # One post-processing worker per ffmpeg slot unless configured
+        postprocess_workers = postprocess_workers or get_executor().max_procs
+        self._pending = queue.Queue()
+        self._stages = [
+            # (name, input queue, workers, handler)
+            ("extract", self._pending, max(1, int(extract_workers)), self._extract),
+            (
+                "download",
+                queue.Queue(maxsize=cfg.PIPELINE_DOWNLOAD_BACKLOG),
+                self.max_workers,
+                self._download,
+            ),
+            (
+                "postprocess",
+                queue.Queue(maxsize=cfg.PIPELINE_POSTPROCESS_BACKLOG),
+                max(1, int(postprocess_workers)),
+                self._postprocess,
+            ),
+        ]
+        self._jobs = {}
+        self._targets = {}
+        self._lock = threading.Lock()
+        self._workers = []
+        self._alive = {}
+        self._listeners = []
+        self._shutdown = False
+
+    def add_listener(self, listener):
+        """Register listener(event, job) for every job's state/progress changes.
+
+        Listeners run on the download threads and must return quickly.
+        """
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def submit(
+        self,
+        url,
+        resolution,
+        handler=None,
+        on_progress=None,
+        on_stage=None,
+        on_complete=None,
+        rate_limit=None,
+        quality=None,
+    ):
+        """Enqueue a download and return its DownloadJob.
+
+        rate_limit optionally caps this job (bytes/s) below its fair share
+        of the global bandwidth limit. quality is a pick_resolution rule
+        resolved once the formats are known (resolution may then be None).
+        A request for a video/quality that is already queued or running is
+        joined to that job, which is returned instead of a new one.
+        Invalid arguments raise ValueError before anything is registered.
+        """
+        resolution, quality, rate_limit = validate_request(
+            resolution, quality, rate_limit
+        )
+        video_id = getattr(handler, "video_id", None) or extract_video_id(url)
+        target = (video_id or url, resolution or quality)
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError("Download queue is shut down")
+            existing = self._targets.get(target)
+            if existing is not None:
+                existing.follow(on_progress, on_stage, on_complete)
+                print(f"[INFO] Already in the queue, joined job {existing.id}")
+                return existing
+
+            job = DownloadJob(
+                url,
+                resolution,
+                handler=handler,
+                on_progress=on_progress,
+                on_stage=on_stage,
+                on_complete=on_complete,
+                quality=quality,
+                listeners=self._listeners,
+            )
+            job.target = target
+            self._targets[target] = job
+            self._jobs[job.id] = job
+            self._ensure_workers()
+        if rate_limit:
+            limiter.set_job_limit(job.id, rate_limit)
+        self._pending.put(job)
+        job._notify("queued")
+        return job
+
+    def resume_pending(self, on_progress=None, on_stage=None, on_complete=None):
+        """Re-enqueue every journaled job left over from an abort/crash/restart"""
+        resumed = []
+        active = {(j.url, j.resolution) for j in self.active_jobs()}
+        for record in journal.pending():
+            if (record["url"], record["resolution"]) in active:
+                continue
+            resumed.append(
+                self.submit(
+                    record["url"],
+                    record["resolution"],
+                    on_progress=on_progress,
+                    on_stage=on_stage,
+                    on_complete=on_complete,
+                )
+            )
+        return resumed
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self):
+        with self._lock:
+            return list(self._jobs.values())
+
+    def active_jobs(self):
+        return [j for j in self.jobs() if not j.is_finished]
+
+    def forget_finished(self):
+        """Drop finished jobs from the registry"""
+        with self._lock:
+            for job_id in [k for k, j in self._jobs.items() if j.is_finished]:
+                del self._jobs[job_id]
+
+    def abort_all(self):
+        for job in self.active_jobs():
+            job.abort()
+
+    def stage_depths(self):
+        """Jobs waiting in front of each pipeline stage"""
+        return {name: q.qsize() for name, q, _, _ in self._stages}
+
+    def shutdown(self, abort=True):
+        with self._lock:
+            self._shutdown = True
+            workers = list(self._workers)
+        if abort:
+            self.abort_all()
+        # Only the first stage is told to stop; each stage passes the stop on
+        # once its last worker exits, so no job is left behind in a later one
+        if workers:
+            for _ in range(self._stages[0][2]):
+                self._pending.put(None)
+
+    # --- workers ---
+
+    def _ensure_workers(self):
+        if self._workers:
+            return
+        for index, (name, q, count, run) in enumerate(self._stages):
+            self._alive[index] = count
+            for i in range(count):
+                worker = threading.Thread(
+                    target=self._worker_loop,
+                    args=(index, q, run),
+                    name=f"{name}-{i + 1}",
+                    daemon=True,
+                )
+                self._workers.append(worker)
+                worker.start()
+
+    def _worker_loop(self, index, source, run):
+        while True:
+            job = source.get()
+            if job is None:
+                source.task_done()
+                self._stop_next_stage(index)
+                return
+            try:
+                if job.is_aborted:
+                    self._discard(job)
+                    self._complete(job, False, None, "Aborted by user")
+                else:
+                    run(job)
+            except Exception as e:
+                print(f"[ERROR] Job {job.id} failed: {e}")
+                self._complete(job, False, None, str(e))
+            finally:
+                source.task_done()
+
+    def _stop_next_stage(self, index):
+        with self._lock:
+            self._alive[index] -= 1
+            last = self._alive[index] == 0
+        if last and index + 1 < len(self._stages):
+            for _ in range(self._stages[index + 1][2]):
+                self._stages[index + 1][1].put(None)
+
+    def _hand_off(self, stage_index, job):
+        """Queue job for a later stage; blocks while that stage is backlogged"""
+        self._stages[stage_index][1].put(job)
+
+    def _discard(self, job):
+        """Clean up after a job aborted between the download and merge stages"""
+        step, job.postprocess_step = job.postprocess_step, None
+        if step is not None:
+            step.discard()
+
+    def _complete(self, job, success, final_file, error=None):
+        if not success and error is None:
+            error = "Aborted by user" if job.is_aborted else "Download failed"
+        limiter.forget(job.id)
+        with self._lock:
+            if self._targets.get(job.target) is job:
+                del self._targets[job.target]
+        job._finish(success, final_file, error)
+
+    # --- stages ---
+
+    def _extract(self, job):
+        if job.handler is None:
+            job.set_state(STATE_EXTRACTING)
+            handler = YouTubeVideoHandler(job.url)
+            get_controller().run(
+                job.url, handler.fetch_info, check_abort=lambda: job.is_aborted
+            )
+            job.handler = handler
+            job.set_state(STATE_QUEUED)
+
+        if job.quality and not job.resolution:
+            job.resolution = pick_resolution(
+                list(job.handler.formats_map.keys()), job.quality
+            )
+        self._hand_off(1, job)
+
+    def _download(self, job):
+        callbacks = dict(job.callbacks(), defer_postprocess=True)
+        result = logic.run_download(job.url, job.resolution, job.handler, callbacks)
+        if isinstance(result, logic.PostprocessStep):
+            job.postprocess_step = result
+            self._hand_off(2, job)
+            return
+        self._complete(job, *result)
+
+    def _postprocess(self, job):
+        job.set_state(STATE_MERGING)
+        step, job.postprocess_step = job.postprocess_step, None
+        self._complete(job, *step.run())
@@ -0,0 +1,153 @@
+"""
+0xDownloader - Download journal
+
+Keeps a small JSON record per in-flight download (URL, chosen formats, output name,
+bytes done) next to the partial files, so an aborted, crashed or restarted job can
+re-attach to its .part/.ytdl files instead of starting over.
+"""
+
+import json
+import os
+import re
+import threading
+import time
+
+import config as cfg
+
+PARTIAL_SUFFIXES = (".part", ".ytdl")
+STREAM_TEMP_RE = re.compile(r"^f[0-9][0-9A-Za-z_-]*\.[0-9A-Za-z]+$")
+
+
+def format_signature(selected_info):
+    """Identity of the remote formats a download is made of.
+
+    Two signatures only match when the same format ids with the same sizes are
+    served, i.e. the partial bytes on disk still belong to the remote file.
+    """
+    formats = selected_info.get("requested_formats") or [selected_info]
+    return [
+        [
+            f.get("format_id"),
+            f.get("filesize") or f.get("filesize_approx") or 0,
+            f.get("ext"),
+        ]
+        for f in formats
+    ]
+
+
+def discard_partials(download_path, candidate_name):
+    """Delete leftover partial/temporary stream files for candidate_name"""
+    if not candidate_name or not os.path.isdir(download_path):
+        return
+    prefix = f"{candidate_name}."
+    for f in os.listdir(download_path):
+        if not f.startswith(prefix):
+            continue
+        rest = f[len(prefix) :]
+        if (
+            rest.endswith(PARTIAL_SUFFIXES)
+            or ".part-Frag" in rest
+            or STREAM_TEMP_RE.match(rest)
+        ):
+            try:
+                os.remove(os.path.join(download_path, f))
+            except OSError:
+                pass
+
+
+class DownloadJournal:
+    """One JSON file per resumable job under <downloads>/.journal"""
+
+    def __init__(self, folder=None):
+        self.folder = folder or os.path.join(
+            os.getcwd(), cfg.DL_FOLDER_NAME, cfg.DL_JOURNAL_FOLDER_NAME
+        )
+        self._lock = threading.Lock()
+        self._last_flush = {}
+
+    @staticmethod
+    def key_for(video_id, resolution):
+        slug = re.sub(r"[^0-9A-Za-z]+", "_", str(resolution)).strip("_").lower()
+        return f"{video_id}_{slug or 'default'}"
+
+    def _path(self, key):
+        return os.path.join(self.folder, f"{key}.json")
+
+    def load(self, key):
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def save(self, key, record):
+        record = dict(record)
+        record["key"] = key
+        record["updated_at"] = time.time()
+        with self._lock:
+            try:
+                os.makedirs(self.folder, exist_ok=True)
+                tmp_path = self._path(key) + ".tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(record, f)
+                os.replace(tmp_path, self._path(key))
+            except OSError as e:
+                print(f"[WARNING] Journal write failed: {e}")
+        return record
+
+    def update_progress(self, key, bytes_done, force=False):
+        """Persist bytes_done, rate-limited to one write per DL_JOURNAL_FLUSH_INTERVAL"""
+        now = time.time()
+        last_flush = self._last_flush.get(key, 0)
+        if not force and now - last_flush < cfg.DL_JOURNAL_FLUSH_INTERVAL:
+            return
+        self._last_flush[key] = now
+        record = self.load(key)
+        if record is not None:
+            record["bytes_done"] = int(bytes_done)
+            self.save(key, record)
+
+    def remove(self, key):
+        self._last_flush.pop(key, None)
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def owned_names(self, download_path):
+        """{candidate_name: key} of the journaled jobs saving into download_path"""
+        if not os.path.isdir(self.folder):
+            return {}
+        owned = {}
+        for name in os.listdir(self.folder):
+            if not name.endswith(".json"):
+                continue
+            record = self.load(name[:-5])
+            if record and record.get("download_path") == download_path:
+                owned[record.get("candidate_name")] = name[:-5]
+        return owned
+
+    def pending(self):
+        """All journaled jobs still waiting to be resumed (expired ones are dropped)"""
+        if not os.path.isdir(self.folder):
+            return []
+
+        records = []
+        for name in os.listdir(self.folder):
+            if not name.endswith(".json"):
+                continue
+            record = self.load(name[:-5])
+            if record is None:
+                continue
+            if time.time() - record.get("updated_at", 0) > cfg.DL_JOURNAL_MAX_AGE:
+                discard_partials(
+                    record.get("download_path", ""), record.get("candidate_name", "")
+                )
+                self.remove(name[:-5])
+                continue
+            records.append(record)
+
+        return sorted(records, key=lambda r: r.get("updated_at", 0))
+
+
+journal = DownloadJournal()
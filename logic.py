@@ -6,82 +6,167 @@ and format conversion.
 """
 
 import os
+import copy
 import time
+import threading
 import sys
 import re
 import yt_dlp
 import config as cfg
+from engine import get_engine
+from ffmpeg_pool import get_executor
+from hashing import (
+    HASHED_AFTER_WRITE,
+    HASHED_WHILE_WRITING,
+    TailHasher,
+    hash_file,
+    manifest,
+)
+from throttle import get_controller, detect_throttling, ThrottledError
+from bandwidth import limiter
+from archive import archive, names
+from planner import format_selector, plan_postprocessing
+from probe import known_size, probe_missing_sizes
+from sessions import sessions
+from stream_watchdog import ACTION_RECONNECT, ACTION_REEXTRACT, StreamWatchdog
+from progress import ProgressEstimator
+from journal import journal, format_signature, discard_partials
+from modules.metadata_cache import get_streams_expiry
 from yt_dlp.utils import sanitize_filename
-from collections import deque
 
 
-class ThrottleManager:
+SUSPEND_MESSAGE = "Suspended by user"
+STALL_MESSAGE = "Stream throttled, action:"
+
+# Protocols whose streams yt-dlp downloads one file at a time (and can resume)
+PARALLEL_PROTOCOLS = ("http", "https", "m3u8", "m3u8_native", "http_dash_segments")
+
+
+class PostprocessStep:
+    """Merge/extract pass of a download whose streams are already on disk.
+
+    Returned by run_download instead of a result when the caller asked for
+    "defer_postprocess", so the ffmpeg work can run on another thread while
+    the download slot moves on; run() returns the usual (success, path).
+    A job aborted before its turn calls discard() instead, which deletes the
+    downloaded streams and frees the output name.
+    """
+
+    def __init__(self, run, discard):
+        self.run = run
+        self.discard = discard
+
+
+class DownloadSuspended(yt_dlp.utils.DownloadError):
+    """Raised from a progress hook to tear the download down while paused."""
+
     def __init__(self):
-        self.is_throttled = False
-        self.retry_count = 0
-        self.last_throttle_time = 0
-
-    def detect_throttling(self, error_msg: str) -> bool:
-        """Detect whether the error message indicates throttling / rate-limiting."""
-        error_lower = str(error_msg).lower()
-        throttle_indicators = [
-            "throttling",
-            "429",
-            "too many requests",
-            "rate limit",
-            "slow down",
-            "temporary failure",
-        ]
-        return any(indicator in error_lower for indicator in throttle_indicators)
+        super().__init__(SUSPEND_MESSAGE)
 
-    def get_retry_delay(self) -> int:
-        """Exponential backoff delay (capped)."""
-        base_delay = cfg.THROTTLE_RETRY_DELAY
-        delay = base_delay * (cfg.THROTTLE_BACKOFF_MULTIPLIER**self.retry_count)
-        return min(int(delay), 300)
 
-    def should_retry(self) -> bool:
-        return self.retry_count < cfg.THROTTLE_MAX_RETRIES
+class StreamStalled(yt_dlp.utils.DownloadError):
+    """Raised from a progress hook to drop the connection of a throttled stream."""
 
-    def mark_throttled(self):
-        self.is_throttled = True
-        self.retry_count += 1
-        self.last_throttle_time = time.time()
+    def __init__(self, action):
+        super().__init__(f"{STALL_MESSAGE} {action}")
+        self.action = action
 
-    def reset(self):
-        self.is_throttled = False
-        self.retry_count = 0
 
+def stall_action(error):
+    """Watchdog action carried by error (also when yt-dlp wrapped it), or None"""
+    if isinstance(error, StreamStalled):
+        return error.action
+    message = str(error)
+    if STALL_MESSAGE not in message:
+        return None
+    return message.split(STALL_MESSAGE, 1)[1].split()[0]
 
-def get_real_total_size(url, ydl_opts, throttle_manager=None):
-    try:
-        opts = ydl_opts.copy()
-        opts["quiet"] = True
-        opts["simulate"] = True
-        opts.pop("concurrent_fragment_downloads", None)
 
-        with yt_dlp.YoutubeDL(opts) as ydl:
-            info = ydl.extract_info(url, download=False)
+def _quiet_opts(ydl_opts):
+    """Copy of ydl_opts suitable for metadata-only work (no hooks, no output)."""
+    opts = ydl_opts.copy()
+    opts["quiet"] = True
+    opts["simulate"] = True
+    opts.pop("concurrent_fragment_downloads", None)
+    opts.pop("progress_hooks", None)
+    opts.pop("postprocessor_hooks", None)
+    opts.pop("postprocessors", None)
+    return opts
 
-        title = info.get("title", "Unknown")
 
-        if "requested_formats" in info:
-            total = sum(
-                f.get("filesize") or f.get("filesize_approx") or 0
-                for f in info["requested_formats"]
-            )
-            return total, title
+def extract_info(url):
+    """Single extraction round trip, only used when no info dict was handed over."""
+    return get_engine().extract(url)
 
-        return info.get("filesize") or info.get("filesize_approx") or 0, title
 
-    except Exception as e:
-        if throttle_manager and throttle_manager.detect_throttling(str(e)):
-            throttle_manager.mark_throttled()
-            raise Exception("THROTTLING_DETECTED")
-        return 0, "Unknown"
+def select_formats(info, ydl_opts):
+    """Run yt-dlp format selection on an already-extracted info dict.
+
+    Works on a copy and never touches the network, so the result only carries
+    the chosen requested_formats / format fields.
+    """
+    with yt_dlp.YoutubeDL(_quiet_opts(ydl_opts)) as ydl:
+        return ydl.process_ie_result(copy.deepcopy(info), download=False)
+
+
+def get_real_total_size(selected_info):
+    """Total bytes and title of a format-selected info dict."""
+    title = selected_info.get("title", "Unknown")
+
+    if "requested_formats" in selected_info:
+        total = sum(known_size(f) for f in selected_info["requested_formats"])
+        return total, title
+
+    return known_size(selected_info), title
+
+
+def _outtmpl(download_path, name):
+    """Output template for a literal file name (escapes yt-dlp's % syntax)"""
+    return os.path.join(download_path, name.replace("%", "%%") + ".%(ext)s")
+
+
+def streams_expired(info):
+    """True when the signed stream URLs in info are (about to be) rejected"""
+    expiry = get_streams_expiry(info)
+    if not expiry:
+        return False
+    return time.time() >= expiry - cfg.META_CACHE_URL_EXPIRY_MARGIN
+
+
+def urls_rejected(error, info):
+    """True when a download failed because its stream URLs are no longer valid.
+
+    The server answers 403 once a signed URL expired (or was issued to another
+    IP); fragment downloads only report "giving up", so an expiry that passed
+    meanwhile counts too.
+    """
+    message = str(error).lower()
+    return "http error 403" in message or streams_expired(info)
 
 
 def run_download(url, resolution, handler, callbacks):
+    """Download with iterative retries driven by the shared throttle controller.
+
+    Returns (success, final_path), or a PostprocessStep once the streams are on
+    disk when callbacks["defer_postprocess"] is set.
+    """
+    check_abort = callbacks.get("check_abort")
+    partial = {"path": None}
+
+    try:
+        return get_controller().run(
+            url,
+            lambda: _download_attempt(url, resolution, handler, callbacks, partial),
+            check_abort=check_abort,
+        )
+    except ThrottledError:
+        if not (check_abort and check_abort()):
+            print("[ERROR] Max throttling retries reached. Aborting.")
+        return False, partial["path"]
+
+
+def _download_attempt(url, resolution, handler, callbacks, partial):
+    """One download attempt; throttling errors propagate to the controller."""
     download_path = os.path.join(os.getcwd(), cfg.DL_FOLDER_NAME)
     if not os.path.exists(download_path):
         os.makedirs(download_path)
@@ -91,11 +176,7 @@ def run_download(url, resolution, handler, callbacks):
     check_abort = callbacks.get("check_abort")
     check_pause = callbacks.get("check_pause")
 
-    if stage_callback:
-        stage_callback("downloading")
-
     final_filename = None
-    throttle_manager = ThrottleManager()
 
     ydl_opts = {
         "quiet": False,
@@ -107,22 +188,16 @@ def run_download(url, resolution, handler, callbacks):
         "retries": cfg.DL_RETRIES,
         "fragment_retries": cfg.DL_RETRIES,
         "file_access_retries": cfg.DL_FILE_ACCESS_RETRIES,
-        "no_continue": True,
+        "continuedl": cfg.DL_RESUME_ENABLED,
         "part": True,
         "geo_bypass": True,
         "http_chunk_size": cfg.DL_HTTP_CHUNK_SIZE,
     }
 
+    # Output container and ffmpeg commands come from the post-processing plan
+    # once the formats are selected
     if "Audio" in resolution:
         ydl_opts["format"] = "bestaudio/best"
-        ydl_opts["postprocessors"] = [
-            {
-                "key": "FFmpegExtractAudio",
-                "preferredcodec": "mp3",
-                "preferredquality": cfg.DL_AUDIO_QUALITY,
-            }
-        ]
-        final_ext = "mp3"
         target_h = "Audio"
     else:
         res_key = resolution.lower().strip()
@@ -131,44 +206,139 @@ def run_download(url, resolution, handler, callbacks):
         h = int(nums[0]) if nums else hmap.get(res_key, 1080)
         target_h = h
 
-        format_str = (
-            f"bestvideo[height={h}]+bestaudio/" f"bestvideo[height<={h}]+bestaudio/best"
-        )
-        ydl_opts["format"] = format_str
+        ydl_opts["format"] = format_selector(h)
         ydl_opts["merge_output_format"] = "mp4"
-        ydl_opts["postprocessor_args"] = {
-            "ffmpeg": ["-c:v", "copy", "-c:a", "aac", "-b:a", cfg.DL_AUDIO_BITRATE]
-        }
-        final_ext = "mp4"
+
+    if stage_callback:
+        stage_callback("extracting")
 
     print("[INFO] Analyzing metadata (Default Client)...")
 
+    # Reuse the info dict the handler already extracted; only extract here
+    # when nothing was handed over (e.g. a job queued by URL alone).
+    # Pre-resolved jobs may have waited in the queue past the URL expiry
+    if handler is not None and (
+        getattr(handler, "urls_expired", False)
+        or streams_expired(getattr(handler, "video_info", None) or {})
+    ):
+        print("[INFO] Cached stream URLs expired, refreshing metadata...")
+        try:
+            handler.refresh_info()
+        except Exception as e:
+            print(f"[ERROR] Error: {e}")
+            return False, None
+
+    info = getattr(handler, "video_info", None) if handler else None
+    if not info:
+        try:
+            info = extract_info(url)
+        except Exception as e:
+            if detect_throttling(e):
+                raise
+            print(f"[ERROR] Error: {e}")
+            return False, None
+
+    # Exact ids from the handler's format index (cost-aware policy); the
+    # generic selector after "/" only matters if those ids are gone
+    select_format = getattr(handler, "select_format", None)
+    selection = None
+    if select_format and target_h != "Audio":
+        selection = select_format(target_h)
+    if selection:
+        ydl_opts["format"] = f"{selection.spec}/{ydl_opts['format']}"
+        print(f"[INFO] Format selection: {selection.describe()}")
+
     try:
-        global_total_bytes, video_title = get_real_total_size(
-            url, ydl_opts, throttle_manager
-        )
+        selected_info = select_formats(info, ydl_opts)
     except Exception as e:
-        if "THROTTLING_DETECTED" in str(e):
-            if throttle_manager.should_retry():
-                delay = throttle_manager.get_retry_delay()
-                print(
-                    f"[WARNING] Throttling detected. Waiting {delay}s before retry..."
-                )
-                time.sleep(delay)
-                return run_download(url, resolution, handler, callbacks)
-            print("[ERROR] Max throttling retries reached. Aborting.")
+        print(f"[ERROR] Error: {e}")
+        return False, None
+
+    plan = plan_postprocessing(selected_info, audio_only="Audio" in resolution)
+    print(f"[INFO] Post-processing plan: {plan.mode} ({plan.reason})")
+    final_ext = plan.final_ext
+
+    video_id = getattr(handler, "video_id", None) or info.get("id")
+    if cfg.ARCHIVE_ENABLED and cfg.ARCHIVE_SKIP_DUPLICATES:
+        archived = archive.lookup(video_id, resolution, final_ext)
+        if archived:
+            print(f"[INFO] Already downloaded, skipping: {archived['path']}")
+            return True, archived["path"]
+
+    probed, late_probes = probe_missing_sizes(info, selected_info)
+    if probed and handler is not None and hasattr(handler, "store_info"):
+        handler.store_info()
+
+    global_total_bytes, video_title = get_real_total_size(selected_info)
+
+    journal_key = journal.key_for(video_id, resolution)
+    signature = format_signature(selected_info)
+    candidate_name = None
+
+    record = journal.load(journal_key) if cfg.DL_RESUME_ENABLED else None
+    if record:
+        old_path = record.get("download_path") or download_path
+        old_name = record["candidate_name"]
+        if not names.reserve(old_path, old_name):
+            print(f"[ERROR] {old_name} is already being downloaded by another job")
             return False, None
-        raise
 
-    basename = sanitize_filename(video_title)
-    candidate_name = basename
-    counter = 1
-    while os.path.exists(os.path.join(download_path, f"{candidate_name}.{final_ext}")):
-        candidate_name = f"{basename} ({counter})"
-        counter += 1
+        old_final = record.get("final_path") or os.path.join(
+            old_path, f"{old_name}.{final_ext}"
+        )
+        if os.path.exists(old_final):
+            print("[WARNING] Journaled download already finished, starting a new one")
+        elif record.get("signature") != signature:
+            print("[WARNING] Remote formats changed, restarting download from zero")
+        else:
+            candidate_name = old_name
+            done_mb = record.get("bytes_done", 0) / 1024 / 1024
+            print(f"[INFO] Resuming previous download ({done_mb:.1f} MB on disk)")
+
+        if candidate_name is None:
+            discard_partials(old_path, old_name)
+            journal.remove(journal_key)
+            names.release(old_path, old_name)
+
+    if candidate_name is None:
+        # Names of other journaled downloads are taken: their partials wait
+        # for a resume even when no final file exists yet
+        owned = journal.owned_names(download_path)
+        candidate_name = names.allocate(
+            download_path, sanitize_filename(video_title), final_ext, owned=owned
+        )
+
+        # Stray partials without a journal can't be validated: never continue them
+        if owned.get(candidate_name) in (None, journal_key):
+            discard_partials(download_path, candidate_name)
+
+        if cfg.DL_RESUME_ENABLED:
+            journal.save(
+                journal_key,
+                {
+                    "url": url,
+                    "video_id": video_id,
+                    "resolution": resolution,
+                    "format_ids": [f[0] for f in signature],
+                    "signature": signature,
+                    "download_path": download_path,
+                    "candidate_name": candidate_name,
+                    "final_path": os.path.join(
+                        download_path, f"{candidate_name}.{final_ext}"
+                    ),
+                    "total_bytes": global_total_bytes,
+                    "bytes_done": 0,
+                },
+            )
 
     full_final_path = os.path.join(download_path, f"{candidate_name}.{final_ext}")
-    ydl_opts["outtmpl"] = os.path.join(download_path, f"{candidate_name}.%(ext)s")
+    ydl_opts["outtmpl"] = _outtmpl(download_path, candidate_name)
+
+    bw_key = callbacks.get("job_id") or journal_key
+    if limiter.enabled:
+        # Small fixed reads keep the token bucket accounting fine-grained
+        ydl_opts["buffersize"] = cfg.BW_CHUNK_SIZE
+        ydl_opts["noresizebuffer"] = True
 
     size_mb = (global_total_bytes / 1024 / 1024) if global_total_bytes else 0
     print(f"[HEADER] Title: {video_title[:40]}...")
@@ -176,108 +346,130 @@ def run_download(url, resolution, handler, callbacks):
     print(f"[HEADER] Size: {size_mb:.2f} MB")
     print(f"[HEADER] Quality: {target_h}p")
 
+    if stage_callback:
+        stage_callback("downloading")
+
     print("[BLUE] Initializing streams...")
     print("[WARNING] Downloading file...")
 
+    # Per-file accounting: streams may be downloaded one after the other or
+    # concurrently, and yt-dlp re-reports streams that are already on disk.
     state = {
-        "finished_files_bytes": 0,
-        "current_file_bytes": 0,
-        "files_downloaded_count": 0,
+        "stream_bytes": {},
+        "done_bytes": 0,
+        "finished_files": set(),
+        "stop_streams": False,
     }
+    state_lock = threading.Lock()
+
+    estimator = ProgressEstimator(global_total_bytes, kind=plan.kind)
+
+    # Reconnecting a throttled stream relies on continuing its partial file
+    watchdog = None
+    if cfg.WATCHDOG_ENABLED and cfg.DL_RESUME_ENABLED:
+        watchdog = StreamWatchdog(candidate_name)
+        if not limiter.enabled:
+            # yt-dlp grows its read size with the speed; one such read can
+            # take tens of seconds once a stream is throttled, hiding it
+            ydl_opts["buffersize"] = cfg.WATCHDOG_READ_SIZE
+            ydl_opts["noresizebuffer"] = True
 
-    speed_buffer = deque(maxlen=cfg.DL_SMOOTHING_WINDOW)
-    last_ui_update_time = 0
-    is_in_postprocessing = False
+    def _on_late_probe(_future):
+        with state_lock:
+            estimator.set_total(get_real_total_size(selected_info)[0])
+
+    for future in late_probes:
+        future.add_done_callback(_on_late_probe)
 
     def _pause_gate():
-        """Hard pause gate: blocks the download thread while paused."""
+        """Hard pause gate: blocks the calling thread while paused."""
         while check_pause and check_pause():
             if check_abort and check_abort():
                 raise yt_dlp.utils.DownloadError("Aborted by user")
             time.sleep(0.2)
 
     def progress_hook(d):
-        nonlocal last_ui_update_time, final_filename, is_in_postprocessing
-
-        _pause_gate()
+        nonlocal final_filename
 
-        if is_in_postprocessing:
-            if check_abort and check_abort():
-                raise yt_dlp.utils.DownloadError("Aborted by user")
-            return
+        if not cfg.DL_RESUME_ENABLED:
+            _pause_gate()
+        elif check_pause and check_pause():
+            # Unwind yt-dlp so its sockets get closed; the partial files stay
+            # on disk and the transfer continues later with a Range request.
+            raise DownloadSuspended()
 
         if check_abort and check_abort():
             d["status"] = "aborted"
             raise yt_dlp.utils.DownloadError("Aborted by user")
 
+        if state["stop_streams"]:
+            raise yt_dlp.utils.DownloadError("Stopped: sibling stream failed")
+
         if d.get("filename"):
             final_filename = d["filename"]
 
         if d["status"] == "downloading":
-            current_time = time.time()
-
-            state["current_file_bytes"] = d.get("downloaded_bytes", 0)
-            actual_downloaded = (
-                state["finished_files_bytes"] + state["current_file_bytes"]
-            )
-
-            p = (
-                (actual_downloaded / global_total_bytes) * 100
-                if global_total_bytes
-                else 0
-            )
-            if p > 99.9:
-                p = 99.9
-
-            raw_speed = d.get("speed")
-            if raw_speed and raw_speed > 0:
-                speed_buffer.append(raw_speed)
-
-            avg_speed = (sum(speed_buffer) / len(speed_buffer)) if speed_buffer else 0
-
-            if (current_time - last_ui_update_time > cfg.DL_UI_UPDATE_DELAY) or (
-                p >= 99.0
-            ):
-                last_ui_update_time = current_time
-
-                eta = d.get("eta")
-                spd_str = (
-                    f"{avg_speed/1024/1024:.2f} MB/s" if avg_speed > 0 else "-- MB/s"
-                )
-
-                if eta is None:
-                    eta_str = "--:--"
-                else:
-                    m, s = divmod(int(eta), 60)
-                    if m >= 60:
-                        h, m = divmod(m, 60)
-                        eta_str = f"{int(h)}:{int(m):02}:{int(s):02}"
-                    else:
-                        eta_str = f"{int(m):02}:{int(s):02}"
-
-                sz_str = (
-                    f"{global_total_bytes/1024/1024:.1f} MB"
-                    if global_total_bytes
-                    else "---"
+            filename = d.get("filename")
+            downloaded = d.get("downloaded_bytes", 0)
+
+            with state_lock:
+                # The first report of a stream may include bytes resumed from
+                # disk, so only deltas between reports count as transferred
+                previous = state["stream_bytes"].get(filename)
+                transferred = downloaded - previous if previous is not None else 0
+                state["done_bytes"] += downloaded - (previous or 0)
+                state["stream_bytes"][filename] = downloaded
+                actual_downloaded = state["done_bytes"]
+                emit = estimator.update(actual_downloaded, transferred)
+                figures = estimator.figures() if emit else None
+
+            if cfg.DL_RESUME_ENABLED:
+                journal.update_progress(journal_key, actual_downloaded)
+
+            limiter.throttle(bw_key, transferred, check_abort)
+
+            if tail_hasher is not None:
+                tail_hasher.feed(d.get("tmpfilename") or filename, downloaded)
+
+            if figures and progress_callback:
+                progress_callback(*figures)
+
+            if watchdog is not None:
+                stream_info = d.get("info_dict") or {}
+                action = watchdog.update(
+                    stream_info.get("format_id") or filename, downloaded, stream_info
                 )
-
-                if progress_callback:
-                    progress_callback(p, spd_str, eta_str, sz_str)
+                if action:
+                    raise StreamStalled(action)
 
         elif d["status"] == "finished":
-            state["finished_files_bytes"] += d.get("total_bytes", 0)
-            state["current_file_bytes"] = 0
-            state["files_downloaded_count"] += 1
+            filename = d.get("filename")
+            with state_lock:
+                total = d.get("total_bytes", 0)
+                state["done_bytes"] += total - state["stream_bytes"].get(filename, 0)
+                state["stream_bytes"][filename] = total
+                if filename in state["finished_files"]:
+                    return
+                state["finished_files"].add(filename)
+                if tail_hasher is not None:
+                    tail_hasher.feed(filename, total, force=True)
+                estimator.update(state["done_bytes"])
+                estimator.force_emit()
+                figures = estimator.figures()
+
+            if progress_callback:
+                progress_callback(*figures)
 
             final_filename = d.get("filename", final_filename)
 
+            stream_info = d.get("info_dict") or {}
             file_type = (
                 "Audio Track"
                 if "Audio" in resolution
                 else (
-                    "Video Stream"
-                    if state["files_downloaded_count"] == 1
-                    else "Audio Stream"
+                    "Audio Stream"
+                    if stream_info.get("vcodec") == "none"
+                    else "Video Stream"
                 )
             )
             file_size_mb = (
@@ -285,50 +477,298 @@ def run_download(url, resolution, handler, callbacks):
             )
             print(f"[SUCCESS] {file_type} completed ({file_size_mb:.1f} MB)")
 
-    def postprocessor_hook(d):
-        nonlocal is_in_postprocessing
-
-        _pause_gate()
-
-        if d.get("status") == "started":
-            if not is_in_postprocessing:
-                is_in_postprocessing = True
-                if stage_callback:
-                    stage_callback("merging")
-                print("[BLUE] Merging video & audio into container...")
-                sys.stdout.flush()
-
     ydl_opts["progress_hooks"] = [progress_hook]
-    ydl_opts["postprocessor_hooks"] = [postprocessor_hook]
 
-    try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            ydl.download([url])
+    def _refresh_streams():
+        """Re-extract for fresh stream URLs; partials of unchanged formats stay.
+
+        When the selection changed, everything derived from it follows: the
+        signature, the post-processing plan, the output extension and the
+        journal record, so later refreshes compare against the new formats.
+        """
+        nonlocal info, selected_info, plan, signature
+        nonlocal final_ext, full_final_path, tail_hasher
+
+        if handler is not None and hasattr(handler, "refresh_info"):
+            handler.refresh_info()
+            info = handler.video_info
+        else:
+            info = extract_info(url)
+
+        selected_info = select_formats(info, ydl_opts)
+        probe_missing_sizes(info, selected_info)
+        with state_lock:
+            estimator.set_total(get_real_total_size(selected_info)[0])
+        fresh_signature = format_signature(selected_info)
+        if fresh_signature == signature:
+            return
 
-        if not is_in_postprocessing:
-            is_in_postprocessing = True
-            if stage_callback:
-                stage_callback("merging")
+        print("[WARNING] Remote formats changed, restarting download from zero")
+        discard_partials(download_path, candidate_name)
+        signature = fresh_signature
+        plan = plan_postprocessing(selected_info, audio_only="Audio" in resolution)
+        final_ext = plan.final_ext
+        full_final_path = os.path.join(download_path, f"{candidate_name}.{final_ext}")
+        needs_ffmpeg = plan.ffmpeg_args(_stream_files(), full_final_path) is not None
+        tail_hasher = TailHasher() if cfg.HASH_ENABLED and not needs_ffmpeg else None
+        with state_lock:
+            estimator.kind = plan.kind
+
+        record = journal.load(journal_key)
+        if record is not None:
+            record.update(
+                signature=signature,
+                format_ids=[f[0] for f in signature],
+                final_path=full_final_path,
+                total_bytes=estimator.total_bytes,
+                bytes_done=0,
+            )
+            journal.save(journal_key, record)
+
+    def _reconnect():
+        # yt-dlp re-reports already finished streams, so start counting afresh
+        with state_lock:
+            state["stream_bytes"].clear()
+            state["done_bytes"] = 0
+            state["finished_files"].clear()
+            estimator.reset_speed()
+        if watchdog is not None:
+            watchdog.reconnected()
+        print("[INFO] Reconnecting with range requests...")
+
+    def _suspend():
+        """Wait (holding no connection) until resumed; False if aborted meanwhile."""
+        journal.update_progress(journal_key, state["done_bytes"], force=True)
+        print("[INFO] Paused: connections released, progress checkpointed")
 
-        throttle_manager.reset()
-        return True, full_final_path
+        while check_pause and check_pause():
+            if check_abort and check_abort():
+                return False
+            time.sleep(0.2)
+        if check_abort and check_abort():
+            return False
+
+        if streams_expired(info):
+            print("[INFO] Stream URLs expired while paused, refreshing metadata...")
+            _refresh_streams()
+        _reconnect()
+        return True
+
+    def _stream_files():
+        """(format, path) of every selected stream as _download_streams saves it"""
+        formats = selected_info.get("requested_formats")
+        if not formats:
+            name = f"{candidate_name}.{selected_info['ext']}"
+            return [(selected_info, os.path.join(download_path, name))]
+        return [
+            (
+                f,
+                os.path.join(
+                    download_path, f"{candidate_name}.f{f['format_id']}.{f['ext']}"
+                ),
+            )
+            for f in formats
+        ]
 
-    except Exception as e:
-        error_msg = str(e)
+    def _download_streams():
+        """Put the selected streams on disk without post-processing them.
+
+        Merged selections land at "<name>.f<format_id>.<ext>" and are fetched
+        concurrently when DL_PARALLEL_STREAMS allows it; a single format lands
+        at "<name>.<ext>". ffmpeg runs afterwards in _postprocess.
+        """
+        formats = selected_info.get("requested_formats") or []
+        parallel = (
+            cfg.DL_PARALLEL_STREAMS
+            and len(formats) >= 2
+            and all(f.get("protocol") in PARALLEL_PROTOCOLS for f in formats)
+        )
 
-        if throttle_manager.detect_throttling(error_msg):
-            if throttle_manager.should_retry():
-                delay = throttle_manager.get_retry_delay()
-                print(
-                    f"[WARNING] Throttling detected during download. Waiting {delay}s..."
+        errors = []
+        state["stop_streams"] = False
+
+        def _fetch(fmt, name):
+            opts = dict(ydl_opts)
+            opts.pop("merge_output_format", None)
+            opts["format"] = fmt["format_id"]
+            opts["outtmpl"] = _outtmpl(download_path, name)
+            while True:
+                try:
+                    with sessions.attach(yt_dlp.YoutubeDL(opts)) as ydl:
+                        ydl.process_ie_result(copy.deepcopy(info), download=True)
+                    return
+                except Exception as e:
+                    if (
+                        stall_action(e) == ACTION_RECONNECT
+                        and not state["stop_streams"]
+                    ):
+                        # Only this stream reconnects; its partial file continues
+                        watchdog.reconnected(fmt["format_id"])
+                        print(f"[INFO] Reconnecting stream {fmt['format_id']}...")
+                        continue
+                    errors.append(e)
+                    state["stop_streams"] = True
+                    return
+
+        if not formats:
+            _fetch(selected_info, candidate_name)
+        elif parallel:
+            threads = [
+                threading.Thread(
+                    target=_fetch,
+                    args=(f, f"{candidate_name}.f{f['format_id']}"),
+                    name=f"stream-{f['format_id']}",
                 )
-                time.sleep(delay)
-                return run_download(url, resolution, handler, callbacks)
-            print("[ERROR] Max throttling retries reached.")
-            return False, final_filename if final_filename else full_final_path
+                for f in formats
+            ]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        else:
+            for f in formats:
+                _fetch(f, f"{candidate_name}.f{f['format_id']}")
+                if errors:
+                    break
+
+        if errors:
+            suspended = [e for e in errors if isinstance(e, DownloadSuspended)]
+            raise suspended[0] if suspended else errors[0]
+
+    def _handle_error(e):
+        error_msg = str(e)
+
+        if detect_throttling(error_msg):
+            partial["path"] = final_filename if final_filename else full_final_path
+            raise e
 
         if "Aborted" in error_msg:
             return False, final_filename if final_filename else full_final_path
 
         print(f"[ERROR] Error: {e}")
         return False, None
+
+    def _record_hashes():
+        """Digests of the final file, written to its manifest (None when off).
+
+        Only files downloaded straight to their final name are hashed while
+        written. ffmpeg seeks back into its mp4 output, so it cannot be piped
+        through the hasher: merged and transcoded files cost one full read here.
+        """
+        if not cfg.HASH_ENABLED:
+            return None
+        if tail_hasher is not None and tail_hasher.position == os.path.getsize(
+            full_final_path
+        ):
+            digests = tail_hasher.digests()
+            hashed = HASHED_WHILE_WRITING
+        else:
+            # Read back right away, while the file is still in the page cache
+            digests = hash_file(full_final_path)
+            hashed = HASHED_AFTER_WRITE
+        manifest.write(full_final_path, digests, hashed)
+        return digests
+
+    def _postprocess():
+        """Merge/extract the downloaded streams on the shared ffmpeg executor"""
+        try:
+            streams = _stream_files()
+            ffmpeg_job = plan.ffmpeg_args(streams, full_final_path)
+            merge_cost = None
+            if ffmpeg_job is not None:
+                _pause_gate()
+                if stage_callback:
+                    stage_callback("merging")
+                if plan.is_audio:
+                    print("[BLUE] Extracting audio track...")
+                else:
+                    print("[BLUE] Merging video & audio into container...")
+                sys.stdout.flush()
+
+                inputs, options = ffmpeg_job
+                estimator.start_merge(0.0)
+                _, cpu = get_executor().run(
+                    inputs,
+                    options,
+                    full_final_path,
+                    check_abort=check_abort,
+                    label=candidate_name,
+                )
+                merge_cost = estimator.finish_merge(cpu)
+                for path in inputs:
+                    if path != full_final_path and os.path.exists(path):
+                        os.remove(path)
+
+            plan.report(estimator.total_bytes, *(merge_cost or ()))
+            digests = _record_hashes()
+            journal.remove(journal_key)
+            if cfg.ARCHIVE_ENABLED:
+                archive.add(
+                    video_id,
+                    resolution,
+                    full_final_path,
+                    url=url,
+                    title=video_title,
+                    sha256=digests and digests["sha256"],
+                )
+            return True, full_final_path
+
+        except Exception as e:
+            return _handle_error(e)
+        finally:
+            names.release(download_path, candidate_name)
+
+    def _discard():
+        """Drop the downloaded streams of a job aborted before post-processing"""
+        try:
+            for _, path in _stream_files():
+                if os.path.exists(path):
+                    os.remove(path)
+            discard_partials(download_path, candidate_name)
+            journal.remove(journal_key)
+        finally:
+            names.release(download_path, candidate_name)
+
+    # A download that needs no ffmpeg is already the final file: hash it while
+    # it is written instead of reading it back afterwards
+    tail_hasher = None
+    if cfg.HASH_ENABLED and plan.ffmpeg_args(_stream_files(), full_final_path) is None:
+        tail_hasher = TailHasher()
+
+    url_refreshes = 0
+    try:
+        while True:
+            try:
+                _download_streams()
+                break
+            except Exception as e:
+                if isinstance(e, DownloadSuspended) or SUSPEND_MESSAGE in str(e):
+                    if not _suspend():
+                        raise yt_dlp.utils.DownloadError("Aborted by user")
+                elif stall_action(e) == ACTION_REEXTRACT:
+                    # Reconnecting didn't help: fresh URLs, usually another server
+                    print("[INFO] Watchdog: refreshing metadata for new stream URLs...")
+                    _refresh_streams()
+                    watchdog.reconnected(rearm=True)
+                    _reconnect()
+                elif (
+                    url_refreshes < cfg.DL_URL_REFRESH_RETRIES
+                    and not (check_abort and check_abort())
+                    and urls_rejected(e, info)
+                ):
+                    # Long queues, pauses and backoffs outlive the signed URLs:
+                    # fetch new ones and continue where the partials stop
+                    url_refreshes += 1
+                    print("[WARNING] Stream URLs rejected, refreshing metadata...")
+                    _refresh_streams()
+                    _reconnect()
+                else:
+                    raise
+    except Exception as e:
+        # A retry or a later resume re-attaches to the journaled name
+        names.release(download_path, candidate_name)
+        return _handle_error(e)
+
+    if callbacks.get("defer_postprocess"):
+        return PostprocessStep(_postprocess, _discard)
+    return _postprocess()
@@ -0,0 +1,77 @@
+"""
+0xDownloader - Compact metadata
+
+Memory-lean form of an extracted info dict for handlers that stay alive for a
+whole session or wait in a queue. Captions, thumbnails, description and other
+display-only keys are split off so they can be stored aside and loaded lazily;
+storyboard formats and the leftovers of yt-dlp's own format selection are
+dropped; the remaining format dicts share their header dicts and interned
+strings. Formats stay plain dicts because yt-dlp's selector and downloaders
+consume them as such; selection itself reads the slotted FormatIndex.
+"""
+
+import sys
+import threading
+
+from modules.metadata_cache import HEAVY_KEYS
+
+# Rebuilt by every format selection, never worth keeping
+SELECTION_KEYS = ("requested_formats", "requested_subtitles", "requested_downloads")
+
+# Storyboard image formats: large fragment lists, never downloaded
+SKIPPED_PROTOCOLS = ("mhtml",)
+
+# Short repeated values (codecs, containers, protocols...) are interned
+INTERN_MAX_LEN = 64
+
+_headers_lock = threading.Lock()
+_shared_headers = {}
+_SHARED_HEADERS_MAX = 64
+
+
+def _share_headers(headers):
+    """One dict per distinct header set, shared by every format using it"""
+    key = tuple(sorted(headers.items()))
+    with _headers_lock:
+        shared = _shared_headers.get(key)
+        if shared is None:
+            if len(_shared_headers) >= _SHARED_HEADERS_MAX:
+                _shared_headers.clear()
+            shared = _shared_headers[key] = dict(headers)
+        return shared
+
+
+def _compact_value(value):
+    if isinstance(value, str) and len(value) <= INTERN_MAX_LEN:
+        return sys.intern(value)
+    return value
+
+
+def _compact_format(fmt):
+    slim = {}
+    for key, value in fmt.items():
+        if value is None:
+            continue
+        if key == "http_headers" and isinstance(value, dict):
+            slim[key] = _share_headers(value)
+        else:
+            slim[sys.intern(key)] = _compact_value(value)
+    return slim
+
+
+def compact_info(info):
+    """Split info into (slim info, lazily needed keys)"""
+    slim = {}
+    lazy = {}
+    for key, value in info.items():
+        if key in HEAVY_KEYS:
+            lazy[key] = value
+        elif key == "formats":
+            slim[key] = [
+                _compact_format(f)
+                for f in value or []
+                if f.get("protocol") not in SKIPPED_PROTOCOLS
+            ]
+        elif key not in SELECTION_KEYS and value is not None:
+            slim[key] = _compact_value(value)
+    return slim, lazy
@@ -0,0 +1,169 @@
+"""
+0xDownloader - Format index
+
+Compact index of the formats of one video (height, fps, codecs, bitrate, size,
+container, protocol) and the cost-aware selection policies that turn a quality
+label into exact yt-dlp format ids: smallest download, no transcode needed, or
+H.264 for cheap decoding.
+"""
+
+import config as cfg
+from planner import codec_family, fits_mp4
+from probe import known_size
+
+POLICY_BEST = "best"  # yt-dlp's own preference: highest bitrate
+POLICY_SMALLEST = "smallest"  # fewest bytes for the requested quality
+POLICY_COPYABLE = "copyable"  # no ffmpeg transcode, no ffmpeg at all if possible
+POLICY_H264 = "h264"  # H.264 video for cheap decoding on any player
+
+POLICIES = (POLICY_BEST, POLICY_SMALLEST, POLICY_COPYABLE, POLICY_H264)
+
+# Formats that are never downloadable media (storyboards, DRM)
+SKIPPED_PROTOCOLS = ("mhtml",)
+
+
+class FormatEntry:
+    """The selection-relevant fields of one yt-dlp format dict"""
+
+    __slots__ = (
+        "format_id",
+        "height",
+        "fps",
+        "vcodec",
+        "acodec",
+        "tbr",
+        "abr",
+        "filesize",
+        "ext",
+        "protocol",
+        "fits_mp4",
+    )
+
+    def __init__(self, fmt, duration=None):
+        self.format_id = fmt["format_id"]
+        self.height = fmt.get("height") or 0
+        self.fps = fmt.get("fps") or 0
+        self.vcodec = codec_family(fmt.get("vcodec"))
+        self.acodec = codec_family(fmt.get("acodec"))
+        self.tbr = fmt.get("tbr") or (fmt.get("vbr") or 0) + (fmt.get("abr") or 0)
+        self.abr = fmt.get("abr") or 0
+        self.filesize = known_size(fmt) or (
+            int(self.tbr * 1000 / 8 * duration) if self.tbr and duration else 0
+        )
+        self.ext = fmt.get("ext")
+        self.protocol = fmt.get("protocol")
+        self.fits_mp4 = fits_mp4(fmt)
+
+    @property
+    def has_video(self):
+        return self.vcodec != "none"
+
+    @property
+    def has_audio(self):
+        return self.acodec != "none"
+
+    @property
+    def size_key(self):
+        """Sort key preferring known small sizes (unknown sizes sort last)"""
+        return (self.filesize == 0, self.filesize or self.tbr)
+
+    def describe(self):
+        if self.has_video:
+            return f"{self.format_id} {self.vcodec} {self.height}p{self.fps or ''}"
+        return f"{self.format_id} {self.acodec} {self.abr:.0f}k"
+
+
+class FormatSelection:
+    """Exact format ids chosen for a quality label, and why"""
+
+    def __init__(self, entries, policy):
+        self.entries = entries
+        self.policy = policy
+
+    @property
+    def format_ids(self):
+        return [e.format_id for e in self.entries]
+
+    @property
+    def spec(self):
+        return "+".join(self.format_ids)
+
+    @property
+    def filesize(self):
+        return sum(e.filesize for e in self.entries)
+
+    def describe(self):
+        parts = " + ".join(e.describe() for e in self.entries)
+        size = f", ~{self.filesize / 1024 / 1024:.1f} MB" if self.filesize else ""
+        return f"{parts} ({self.policy}{size})"
+
+
+class FormatIndex:
+    """All usable formats of one info dict, grouped for selection"""
+
+    def __init__(self, info):
+        duration = info.get("duration")
+        self.videos = {}  # height -> [video entries (video-only and muxed)]
+        self.audios = []  # audio-only entries
+        for fmt in info.get("formats") or []:
+            if fmt.get("has_drm") or fmt.get("protocol") in SKIPPED_PROTOCOLS:
+                continue
+            entry = FormatEntry(fmt, duration)
+            if entry.has_video and entry.height:
+                self.videos.setdefault(entry.height, []).append(entry)
+            elif entry.has_audio and not entry.has_video:
+                self.audios.append(entry)
+
+    def heights(self):
+        return sorted(self.videos, reverse=True)
+
+    def select(self, height, policy=None):
+        """FormatSelection for a video at height (closest lower one if missing)"""
+        policy = policy if policy in POLICIES else cfg.DL_FORMAT_POLICY
+        available = [h for h in self.heights() if h <= height] or self.heights()[-1:]
+        if not available:
+            return None
+        candidates = self.videos[available[0]]
+
+        if policy == POLICY_COPYABLE and cfg.PP_PREFER_PROGRESSIVE:
+            top_fps = max(e.fps for e in candidates)
+            muxed = [
+                e
+                for e in candidates
+                if e.has_audio and e.ext == "mp4" and e.fps == top_fps
+            ]
+            if muxed:
+                return FormatSelection([max(muxed, key=lambda e: e.tbr)], policy)
+
+        video_only = [e for e in candidates if not e.has_audio] or candidates
+        video = self._pick_video(video_only, policy)
+        if video.has_audio or not self.audios:
+            return FormatSelection([video], policy)
+        return FormatSelection([video, self._pick_audio(policy)], policy)
+
+    @staticmethod
+    def _pick_video(entries, policy):
+        if policy == POLICY_H264:
+            h264 = [e for e in entries if e.vcodec in ("avc1", "avc3")]
+            entries = h264 or entries
+        elif policy == POLICY_COPYABLE:
+            entries = [e for e in entries if e.fits_mp4] or entries
+
+        # A lower frame rate is a lower quality: only the best fps competes
+        top_fps = max(e.fps for e in entries)
+        entries = [e for e in entries if e.fps == top_fps]
+        if policy == POLICY_BEST:
+            return max(entries, key=lambda e: e.tbr)
+        return min(entries, key=lambda e: e.size_key)
+
+    def _pick_audio(self, policy):
+        entries = self.audios
+        if policy != POLICY_BEST and cfg.PP_PREFER_COPYABLE_AUDIO:
+            # An mp4-friendly track keeps the merge a plain stream copy
+            entries = [e for e in entries if e.fits_mp4] or entries
+        top_abr = max(e.abr for e in entries)
+        if policy == POLICY_SMALLEST:
+            # Near-equal quality tracks: take the cheapest one
+            close = [e for e in entries if e.abr >= top_abr * 0.9]
+            return min(close, key=lambda e: e.size_key)
+        return max(entries, key=lambda e: (e.abr, -e.filesize))
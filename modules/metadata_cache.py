@@ -0,0 +1,264 @@
+"""
+0xDownloader - Metadata cache
+
+Persistent on-disk cache of extracted video metadata keyed by canonical video ID,
+with TTL expiry, size-bounded LRU eviction, stream URL expiry flags and hit/miss counters.
+"""
+
+import json
+import os
+import threading
+import time
+from urllib.parse import parse_qs, urlparse
+
+import config as cfg
+
+# Keys that are never needed for the quality menu or the download itself
+HEAVY_KEYS = (
+    "automatic_captions",
+    "subtitles",
+    "thumbnails",
+    "heatmap",
+    "chapters",
+    "description",
+    "tags",
+    "categories",
+)
+
+
+def get_streams_expiry(info):
+    """Earliest 'expire' timestamp found in the signed stream URLs (or None)"""
+    expiry = None
+    for f in info.get("formats", []):
+        url = f.get("url") or f.get("manifest_url")
+        if not url or "expire" not in url:
+            continue
+        try:
+            values = parse_qs(urlparse(url).query).get("expire")
+            if not values:
+                # DASH/HLS manifests carry it as a path segment: /expire/<ts>/
+                parts = urlparse(url).path.split("/")
+                if "expire" in parts:
+                    values = [parts[parts.index("expire") + 1]]
+            if values:
+                ts = int(values[0])
+                expiry = ts if expiry is None else min(expiry, ts)
+        except (ValueError, IndexError):
+            continue
+    return expiry
+
+
+def _entry_bytes(entry):
+    return entry["size"] + entry.get("extra_size", 0)
+
+
+class CachedMetadata:
+    """A cache hit: the stored info dict plus its freshness flags"""
+
+    def __init__(self, video_id, info, stored_at, streams_expire_at):
+        self.video_id = video_id
+        self.info = info
+        self.stored_at = stored_at
+        self.streams_expire_at = streams_expire_at
+
+    @property
+    def urls_expired(self):
+        """True when the stored stream URLs can no longer be downloaded"""
+        if not self.streams_expire_at:
+            return False
+        margin = cfg.META_CACHE_URL_EXPIRY_MARGIN
+        return time.time() >= self.streams_expire_at - margin
+
+
+class MetadataCache:
+    """JSON-file cache of info dicts with TTL and LRU eviction"""
+
+    INDEX_FILE = "index.json"
+
+    def __init__(
+        self,
+        folder=None,
+        ttl=cfg.META_CACHE_TTL,
+        max_entries=cfg.META_CACHE_MAX_ENTRIES,
+        max_bytes=cfg.META_CACHE_MAX_BYTES,
+    ):
+        self.folder = folder or os.path.join(
+            os.getcwd(), cfg.CACHE_FOLDER_NAME, "metadata"
+        )
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        self._index = None
+
+    # --- public API ---
+
+    def get(self, video_id):
+        """Return a CachedMetadata for video_id, or None on miss/expiry"""
+        if not video_id:
+            return None
+
+        with self._lock:
+            index = self._load_index()
+            entry = index.get(video_id)
+
+            if entry is None or time.time() - entry["stored_at"] > self.ttl:
+                if entry is not None:
+                    self._drop(video_id)
+                    self._save_index()
+                self.misses += 1
+                return None
+
+            try:
+                with open(self._entry_path(video_id), "r", encoding="utf-8") as f:
+                    info = json.load(f)
+            except (OSError, ValueError):
+                self._drop(video_id)
+                self._save_index()
+                self.misses += 1
+                return None
+
+            entry["last_access"] = time.time()
+            self._save_index()
+            self.hits += 1
+
+            return CachedMetadata(
+                video_id, info, entry["stored_at"], entry.get("streams_expire_at")
+            )
+
+    def put(self, video_id, info):
+        """Store a (slimmed) copy of info under video_id"""
+        if not video_id or not info:
+            return
+
+        slim = {k: v for k, v in info.items() if k not in HEAVY_KEYS}
+        data = json.dumps(slim, ensure_ascii=False, separators=(",", ":"))
+
+        with self._lock:
+            index = self._load_index()
+            try:
+                os.makedirs(self.folder, exist_ok=True)
+                tmp_path = self._entry_path(video_id) + ".tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    f.write(data)
+                os.replace(tmp_path, self._entry_path(video_id))
+            except OSError as e:
+                print(f"[WARNING] Metadata cache write failed: {e}")
+                return
+
+            now = time.time()
+            index[video_id] = {
+                "stored_at": now,
+                "last_access": now,
+                "size": len(data.encode("utf-8")),
+                "streams_expire_at": get_streams_expiry(info),
+                "extra_size": index.get(video_id, {}).get("extra_size", 0),
+            }
+            self._evict()
+            self._save_index()
+
+    def put_extra(self, video_id, extra):
+        """Store the display-only keys split off an info dict (see compact_info)"""
+        if not video_id or not extra:
+            return
+
+        data = json.dumps(extra, ensure_ascii=False, separators=(",", ":"))
+        with self._lock:
+            entry = self._load_index().get(video_id)
+            if entry is None:
+                return
+            try:
+                tmp_path = self._extra_path(video_id) + ".tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    f.write(data)
+                os.replace(tmp_path, self._extra_path(video_id))
+            except OSError as e:
+                print(f"[WARNING] Metadata cache write failed: {e}")
+                return
+            entry["extra_size"] = len(data.encode("utf-8"))
+            self._evict()
+            self._save_index()
+
+    def get_extra(self, video_id):
+        """Display-only keys of video_id ({} when none were stored)"""
+        try:
+            with open(self._extra_path(video_id), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError, TypeError):
+            return {}
+
+    def invalidate(self, video_id):
+        with self._lock:
+            self._load_index()
+            if self._drop(video_id):
+                self._save_index()
+
+    def stats(self):
+        with self._lock:
+            index = self._load_index()
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(index),
+                "bytes": sum(_entry_bytes(e) for e in index.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            }
+
+    # --- internals (caller holds the lock) ---
+
+    def _entry_path(self, video_id):
+        return os.path.join(self.folder, f"{video_id}.json")
+
+    def _extra_path(self, video_id):
+        return os.path.join(self.folder, f"{video_id}.extra.json")
+
+    def _load_index(self):
+        if self._index is None:
+            try:
+                with open(
+                    os.path.join(self.folder, self.INDEX_FILE), "r", encoding="utf-8"
+                ) as f:
+                    self._index = json.load(f)
+            except (OSError, ValueError):
+                self._index = {}
+        return self._index
+
+    def _save_index(self):
+        try:
+            os.makedirs(self.folder, exist_ok=True)
+            path = os.path.join(self.folder, self.INDEX_FILE)
+            with open(path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(self._index, f)
+            os.replace(path + ".tmp", path)
+        except OSError:
+            pass
+
+    def _drop(self, video_id):
+        entry = self._index.pop(video_id, None)
+        for path in (self._entry_path(video_id), self._extra_path(video_id)):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        return entry is not None
+
+    def _evict(self):
+        """Drop least recently used entries until both bounds are respected"""
+        total = sum(_entry_bytes(e) for e in self._index.values())
+        if len(self._index) <= self.max_entries and total <= self.max_bytes:
+            return
+
+        by_age = sorted(self._index.items(), key=lambda kv: kv[1]["last_access"])
+        for video_id, entry in by_age:
+            if len(self._index) <= self.max_entries and total <= self.max_bytes:
+                break
+            total -= _entry_bytes(entry)
+            self._drop(video_id)
+            self.evictions += 1
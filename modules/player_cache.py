@@ -0,0 +1,145 @@
+"""
+0xDownloader - Player cache
+
+App-owned yt-dlp cache directory (cache/yt-dlp) for YouTube player data: the
+preprocessed players and signature/n-parameter data yt-dlp stores there itself,
+plus the raw player scripts, which yt-dlp only keeps in memory per extractor.
+Scripts and deciphered functions are shared by every pooled extractor, the
+directory is kept under a size cap, and the current player is fetched in the
+background at startup so the first analysis of a session starts warm.
+"""
+
+import os
+import re
+import threading
+
+import config as cfg
+
+
+class PlayerScripts(dict):
+    """Player JS by player key, loaded from and written through to disk.
+
+    Stands in for the YouTube extractor's in-memory _code_cache, which is
+    only ever probed with "in", read with get() and filled by assignment.
+    """
+
+    def __init__(self, folder, on_store=None):
+        super().__init__()
+        self.folder = folder
+        self.on_store = on_store
+        self.disk_hits = 0
+
+    def _path(self, key):
+        return os.path.join(self.folder, re.sub(r"[^\w.-]", "_", key) + ".js")
+
+    def __contains__(self, key):
+        if dict.__contains__(self, key):
+            return True
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                code = f.read()
+            os.utime(path)  # pruning drops the least recently used first
+        except OSError:
+            return False
+        dict.__setitem__(self, key, code)
+        self.disk_hits += 1
+        return True
+
+    def __setitem__(self, key, code):
+        dict.__setitem__(self, key, code)
+        path = self._path(key)
+        try:
+            os.makedirs(self.folder, exist_ok=True)
+            with open(path + ".tmp", "w", encoding="utf-8") as f:
+                f.write(code)
+            os.replace(path + ".tmp", path)
+        except OSError as e:
+            print(f"[WARNING] Player cache write failed: {e}")
+            return
+        if self.on_store:
+            self.on_store()
+
+
+class PlayerCache:
+    """yt-dlp cache directory and player data shared by extraction instances"""
+
+    def __init__(self, folder=None, max_bytes=cfg.PLAYER_CACHE_MAX_BYTES):
+        self.folder = folder or os.path.join(
+            os.getcwd(), cfg.CACHE_FOLDER_NAME, "yt-dlp"
+        )
+        self.max_bytes = max_bytes
+        self.scripts = PlayerScripts(
+            os.path.join(self.folder, "player-js"), on_store=self.prune
+        )
+        self.functions = {}
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    # --- public API ---
+
+    def options(self):
+        """YoutubeDL options pointing yt-dlp's own cache at the app folder"""
+        if not cfg.PLAYER_CACHE_ENABLED:
+            return {}
+        return {"cachedir": self.folder}
+
+    def attach(self, ydl):
+        """Share player scripts and deciphered functions with ydl's extractor"""
+        if not cfg.PLAYER_CACHE_ENABLED:
+            return
+        ie = ydl.get_info_extractor("Youtube")
+        if hasattr(ie, "_code_cache") and hasattr(ie, "_player_cache"):
+            ie._code_cache = self.scripts
+            ie._player_cache = self.functions
+
+    def prewarm(self, ydl):
+        """Initialize ydl's YouTube extractor and load the current player"""
+        if not cfg.PLAYER_CACHE_ENABLED:
+            return
+        self.prune()
+        ie = ydl.get_info_extractor("Youtube")
+        try:
+            ie.initialize()
+            # Same lookup yt-dlp falls back to when a page has no player URL
+            player_url = ie._download_player_url(None)
+            if player_url:
+                ie._load_player(None, player_url, fatal=False)
+        except Exception as e:
+            print(f"[WARNING] Player cache warm-up failed: {e}")
+
+    def prune(self):
+        """Delete least recently used files until the folder fits max_bytes"""
+        with self._lock:
+            files = []
+            for root, _, names in os.walk(self.folder):
+                for name in names:
+                    path = os.path.join(root, name)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    files.append((st.st_mtime, st.st_size, path))
+
+            total = sum(size for _, size, _ in files)
+            for _, size, path in sorted(files):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+                self.evictions += 1
+
+    def stats(self):
+        return {
+            "folder": self.folder,
+            "scripts_in_memory": len(self.scripts),
+            "script_disk_hits": self.scripts.disk_hits,
+            "functions": len(self.functions),
+            "evictions": self.evictions,
+        }
+
+
+player_cache = PlayerCache()
@@ -1,55 +1,101 @@
-import subprocess
-import json
+import re
+
+from engine import get_engine
+from modules.compact_info import compact_info
+from modules.format_index import FormatIndex
+from modules.metadata_cache import MetadataCache
+
+VIDEO_ID_RE = re.compile(
+    r"(?:v=|youtu\.be/|/shorts/|/embed/|/live/|/v/)([A-Za-z0-9_-]{11})"
+)
+
+metadata_cache = MetadataCache()
+
+
+def extract_video_id(url):
+    """Canonical 11-char YouTube video ID from any supported URL shape"""
+    match = VIDEO_ID_RE.search(url or "")
+    return match.group(1) if match else None
+
 
 class YouTubeVideoHandler:
     def __init__(self, url):
         self.url = url
+        self.video_id = extract_video_id(url)
         self.video_info = {}
+        self._extra = None
         self.formats_map = {}
+        self.format_index = None
         self.title = "Unknown"
+        self.from_cache = False
+        self.urls_expired = False
 
     def fetch_info(self):
-        cmd = [
-            "yt-dlp", 
-            self.url, 
-            "--dump-json", 
-            "--no-playlist"
-        ]
-        
-        process = subprocess.run(
-            cmd, 
-            capture_output=True, 
-            text=True, 
-            encoding='utf-8'
-        )
-        
-        if process.returncode != 0:
-            raise Exception(f"Errore yt-dlp: {process.stderr}")
+        cached = metadata_cache.get(self.video_id)
+        if cached:
+            # Title/formats are served from disk; expired stream URLs are only
+            # flagged here and refreshed right before the download starts.
+            self.from_cache = True
+            self.urls_expired = cached.urls_expired
+            self.video_info = compact_info(cached.info)[0]
+            self._extra = None
+            return self._parse_info()
 
-        self.video_info = json.loads(process.stdout)
+        return self.refresh_info()
+
+    def refresh_info(self):
+        """Re-extract to get fresh stream URLs and update the cache"""
+        # Only what selection and download need stays in memory; captions,
+        # thumbnails & co. go to the cache and are loaded on demand
+        self.video_info, extra = compact_info(self._extract())
+        self._extra = None
+        self.from_cache = False
+        self.urls_expired = False
+        cache_id = self.video_id or self.video_info.get("id")
+        metadata_cache.put(cache_id, self.video_info)
+        metadata_cache.put_extra(cache_id, extra)
+        return self._parse_info()
+
+    def store_info(self):
+        """Persist in-place additions to video_info (e.g. probed sizes)"""
+        metadata_cache.put(self.video_id or self.video_info.get("id"), self.video_info)
+
+    def extra(self, key, default=None):
+        """Display-only info key (thumbnails, captions...), loaded on first use"""
+        if self._extra is None:
+            self._extra = metadata_cache.get_extra(
+                self.video_id or self.video_info.get("id")
+            )
+        return self._extra.get(key, default)
+
+    def _extract(self):
+        try:
+            return get_engine().extract(self.url)
+        except Exception as e:
+            raise Exception(f"Errore yt-dlp: {e}")
+
+    def _parse_info(self):
         self.title = self.video_info.get("title", "Video senza titolo")
         
-        formats = self.video_info.get("formats", [])
+        # Each label maps to the exact format ids the selection policy picks
+        self.format_index = FormatIndex(self.video_info)
         self.formats_map = {}
-        
-        for f in formats:
-            height = f.get("height")
-            vcodec = f.get("vcodec")
-            
-            if height and vcodec != "none":
-                res_key = f"{height}p"
-                self.formats_map[res_key] = f["format_id"]
-
-        sorted_resolutions = sorted(
-            self.formats_map.keys(), 
-            key=lambda x: int(x.replace('p', '')), 
-            reverse=True
-        )
+        for height in self.format_index.heights():
+            selection = self.format_index.select(height)
+            self.formats_map[f"{height}p"] = selection.spec
+
+        sorted_resolutions = list(self.formats_map)
 
         return sorted_resolutions, self.title
 
     def get_format_id_for_resolution(self, resolution):
         return self.formats_map.get(resolution, "best")
+
+    def select_format(self, height, policy=None):
+        """FormatSelection for height from the current info (None if unknown)"""
+        if self.format_index is None:
+            return None
+        return self.format_index.select(height, policy)
     
     @property
     def yt_obj(self):
@@ -0,0 +1,221 @@
+"""
+0xDownloader - Post-processing planner
+
+Picks the cheapest ffmpeg path for a format selection instead of always
+re-encoding the audio on merge: nothing at all for a progressive mp4, a plain
+stream-copy merge/remux when the codecs fit the container, and an audio
+transcode only when the container can't carry the source codec. Audio jobs
+keep the native stream (m4a/opus/ogg) unless mp3 is asked for, and any
+unavoidable transcode is capped at the source bitrate. Also reports the
+wall/CPU time saved compared to the old always-transcode paths.
+"""
+
+import math
+
+import config as cfg
+from progress import merge_model
+
+PLAN_NONE = "none"
+PLAN_COPY = "copy"
+PLAN_REMUX = "remux"
+PLAN_TRANSCODE = "transcode"
+PLAN_AUDIO = "audio"
+PLAN_AUDIO_COPY = "audio_copy"
+
+# Codecs (RFC 6381 prefixes as reported by yt-dlp) an mp4 container can carry
+MP4_VIDEO_CODECS = ("avc1", "avc3", "hev1", "hvc1", "av01", "vp09", "vp9")
+MP4_AUDIO_CODECS = ("mp4a", "aac", "mp3", "ac-3", "ec-3")
+
+# Audio files FFmpegExtractAudio keeps as they are, and the container it
+# stream-copies every other native codec into
+COMMON_AUDIO_EXTS = ("m4a", "mp3", "ogg", "opus", "aac", "flac", "wav")
+NATIVE_AUDIO_EXTS = {
+    "mp4a": "m4a",
+    "aac": "m4a",
+    "opus": "opus",
+    "vorbis": "ogg",
+    "mp3": "mp3",
+    "flac": "flac",
+}
+
+
+def codec_family(codec):
+    return (codec or "none").split(".")[0].lower()
+
+
+def fits_mp4(fmt):
+    vcodec = codec_family(fmt.get("vcodec"))
+    acodec = codec_family(fmt.get("acodec"))
+    return (vcodec == "none" or vcodec in MP4_VIDEO_CODECS) and (
+        acodec == "none" or acodec in MP4_AUDIO_CODECS
+    )
+
+
+def native_audio_ext(fmt):
+    """Extension an audio stream keeps without re-encoding (None if it can't)"""
+    if fmt.get("ext") in COMMON_AUDIO_EXTS:
+        return fmt["ext"]
+    return NATIVE_AUDIO_EXTS.get(codec_family(fmt.get("acodec")))
+
+
+def capped_bitrate(source_abr, target_kbps):
+    """Transcode bitrate in kbps: never above what the source carries"""
+    target = int(str(target_kbps).rstrip("kK"))
+    if not source_abr:
+        return target
+    return min(target, math.ceil(source_abr))
+
+
+def _audio_abr(selected_info):
+    formats = selected_info.get("requested_formats") or [selected_info]
+    rates = [f.get("abr") or 0 for f in formats if f.get("acodec") != "none"]
+    return max(rates, default=0)
+
+
+def format_selector(height):
+    """yt-dlp format string for a video download at height, cheapest first"""
+    choices = []
+    if cfg.PP_PREFER_PROGRESSIVE:
+        # A single muxed mp4 at the exact height needs no ffmpeg at all
+        choices.append(
+            f"best[height={height}][ext=mp4][vcodec!=none][acodec!=none]"
+        )
+    for video in (f"bestvideo[height={height}]", f"bestvideo[height<={height}]"):
+        if cfg.PP_PREFER_COPYABLE_AUDIO:
+            choices.append(f"{video}+bestaudio[ext=m4a]")
+        choices.append(f"{video}+bestaudio")
+    choices.append("best")
+    return "/".join(choices)
+
+
+class PostprocessPlan:
+    """What ffmpeg has to do once the streams of a selection are on disk"""
+
+    def __init__(self, mode, reason, merged=True, final_ext="mp4", bitrate=None):
+        self.mode = mode
+        self.reason = reason
+        self.merged = merged
+        self.final_ext = final_ext
+        self.bitrate = bitrate
+
+    @property
+    def kind(self):
+        """MergeTimeModel kind for this plan (None when ffmpeg is not run)"""
+        return {
+            PLAN_COPY: "merge",
+            PLAN_REMUX: "merge",
+            PLAN_TRANSCODE: "transcode",
+            PLAN_AUDIO: "audio",
+            PLAN_AUDIO_COPY: "audio_copy",
+        }.get(self.mode)
+
+    @property
+    def is_audio(self):
+        return self.mode in (PLAN_AUDIO, PLAN_AUDIO_COPY)
+
+    def ffmpeg_args(self, streams, output):
+        """(inputs, options) of the ffmpeg run turning streams into output.
+
+        streams is a list of (format dict, path) in selection order. Returns
+        None when the downloaded file already is the output. The options
+        mirror what yt-dlp's merger/remuxer/audio extractor would pass.
+        """
+        inputs = [path for _, path in streams]
+        if self.mode == PLAN_NONE or (
+            self.mode == PLAN_AUDIO_COPY and inputs == [output]
+        ):
+            return None
+
+        if self.mode == PLAN_AUDIO_COPY:
+            options = ["-vn", "-acodec", "copy"]
+            if self.final_ext == "m4a":
+                options += ["-f", "ipod"]
+        elif self.mode == PLAN_AUDIO:
+            options = ["-vn", "-acodec", "libmp3lame", "-b:a", f"{self.bitrate}k"]
+        elif self.mode == PLAN_REMUX:
+            options = ["-c", "copy", "-map", "0", "-dn"]
+        elif not self.merged:
+            # Only what mp4 can't carry is re-encoded: the audio, and the
+            # video only when its codec doesn't fit either
+            fmt = streams[0][0]
+            options = []
+            if codec_family(fmt.get("vcodec")) in MP4_VIDEO_CODECS + ("none",):
+                options += ["-c:v", "copy"]
+            options += ["-c:a", "aac", "-b:a", f"{self.bitrate}k"]
+        else:
+            options = ["-c", "copy"]
+            for index, (fmt, _) in enumerate(streams):
+                if fmt.get("vcodec") != "none":
+                    options += ["-map", f"{index}:v:0"]
+                if fmt.get("acodec") != "none":
+                    options += ["-map", f"{index}:a:0"]
+            if self.mode == PLAN_TRANSCODE:
+                options += ["-c:a", "aac", "-b:a", f"{self.bitrate}k"]
+
+        if self.final_ext in ("mp4", "m4a"):
+            options += ["-movflags", "+faststart"]
+        return inputs, options
+
+    def report(self, total_bytes, wall=None, cpu=None):
+        """Print what this plan cost and what the old transcode path would have"""
+        spent = f"{wall:.1f}s wall" if wall is not None else "no ffmpeg run"
+        if cpu is not None:
+            spent += f", {cpu:.1f}s CPU"
+        if self.mode in (PLAN_TRANSCODE, PLAN_AUDIO):
+            print(f"[INFO] Post-processing: {self.mode} ({self.reason}) - {spent}")
+            return
+
+        baseline = "audio" if self.is_audio else "transcode"
+        baseline_wall = merge_model.estimate(baseline, total_bytes)
+        baseline_cpu = merge_model.estimate_cpu(baseline, total_bytes)
+        saved = f"~{max(baseline_wall - (wall or 0), 0):.1f}s wall"
+        if baseline_cpu:
+            saved += f", ~{max(baseline_cpu - (cpu or 0), 0):.1f}s CPU"
+        print(
+            f"[INFO] Post-processing: {self.mode} ({self.reason}) - {spent}, "
+            f"saved {saved} vs. {'mp3' if self.is_audio else 'audio'} transcode"
+        )
+
+
+def plan_postprocessing(selected_info, audio_only=False):
+    """Cheapest PostprocessPlan for a format-selected info dict"""
+    abr = _audio_abr(selected_info)
+
+    if audio_only:
+        native_ext = native_audio_ext(selected_info)
+        if cfg.DL_AUDIO_MODE == "native" and native_ext:
+            return PostprocessPlan(
+                PLAN_AUDIO_COPY,
+                f"native {native_ext}, no re-encode",
+                final_ext=native_ext,
+            )
+        bitrate = capped_bitrate(abr, cfg.DL_AUDIO_QUALITY)
+        return PostprocessPlan(
+            PLAN_AUDIO, f"mp3 at {bitrate}k", final_ext="mp3", bitrate=bitrate
+        )
+
+    formats = selected_info.get("requested_formats")
+    if not formats:
+        if selected_info.get("ext") == "mp4":
+            return PostprocessPlan(PLAN_NONE, "progressive mp4", merged=False)
+        if fits_mp4(selected_info):
+            return PostprocessPlan(
+                PLAN_REMUX, "codecs fit mp4, container copy", merged=False
+            )
+        video_fits = codec_family(selected_info.get("vcodec")) in MP4_VIDEO_CODECS
+        return PostprocessPlan(
+            PLAN_TRANSCODE,
+            "audio codec not supported by mp4"
+            if video_fits
+            else "codecs not supported by mp4",
+            merged=False,
+            bitrate=capped_bitrate(abr, cfg.DL_AUDIO_BITRATE),
+        )
+
+    if all(fits_mp4(f) for f in formats):
+        return PostprocessPlan(PLAN_COPY, "codecs fit mp4, stream copy")
+    return PostprocessPlan(
+        PLAN_TRANSCODE,
+        "audio codec not supported by mp4",
+        bitrate=capped_bitrate(abr, cfg.DL_AUDIO_BITRATE),
+    )
@@ -0,0 +1,135 @@
+"""
+0xDownloader - Size probe
+
+Fills in the size of selected formats whose metadata has neither filesize nor
+filesize_approx, so progress has a real total from the first callback. Probes
+run concurrently (HEAD, then a one-byte range request) over the shared
+network session; a probe that outlives the short start-up wait keeps
+running and reports its result later instead of delaying the download.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from yt_dlp.networking import Request
+
+import config as cfg
+from sessions import sessions
+
+PROBE_KEY = "probed_filesize"
+DIRECT_PROTOCOLS = ("http", "https")
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def known_size(fmt):
+    return fmt.get("filesize") or fmt.get("filesize_approx") or fmt.get(PROBE_KEY) or 0
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=cfg.PROBE_WORKERS, thread_name_prefix="size-probe"
+            )
+        return _executor
+
+
+# ============================================================================
+# PROBING
+# ============================================================================
+
+
+def _content_length(url, headers):
+    """Remote size of url from a HEAD, or from a bytes=0-0 Content-Range"""
+    try:
+        response = sessions.urlopen(
+            Request(url, headers=headers, method="HEAD"), cfg.PROBE_TIMEOUT
+        )
+        try:
+            length = response.headers.get("Content-Length")
+        finally:
+            response.close()
+        if length and int(length) > 0:
+            return int(length)
+    except Exception:
+        pass
+
+    # Some servers reject HEAD; a one-byte range still reveals the total
+    response = sessions.urlopen(
+        Request(url, headers={**headers, "Range": "bytes=0-0"}), cfg.PROBE_TIMEOUT
+    )
+    try:
+        content_range = response.headers.get("Content-Range") or ""
+    finally:
+        response.close()
+    total = content_range.rpartition("/")[2]
+    return int(total) if total.isdigit() else 0
+
+
+def probe_format_size(fmt, duration=None):
+    """Best size figure for fmt in bytes (0 when nothing can be told)"""
+    headers = fmt.get("http_headers") or {}
+    protocol = fmt.get("protocol") or "https"
+
+    fragments = fmt.get("fragments") or []
+    if fragments and all(f.get("filesize") for f in fragments):
+        return sum(f["filesize"] for f in fragments)
+
+    if protocol in DIRECT_PROTOCOLS and fmt.get("url"):
+        try:
+            size = _content_length(fmt["url"], headers)
+            if size:
+                return size
+        except Exception as e:
+            fmt_id = fmt.get("format_id")
+            print(f"[WARNING] Size probe failed for format {fmt_id}: {e}")
+
+    # Segmented/manifest streams: fall back to the declared bitrate
+    tbr = fmt.get("tbr") or (fmt.get("vbr") or 0) + (fmt.get("abr") or 0)
+    if tbr and duration:
+        return int(tbr * 1000 / 8 * duration)
+    return 0
+
+
+def _probe_into(fmt, duration):
+    size = probe_format_size(fmt, duration)
+    if size:
+        fmt[PROBE_KEY] = size
+    return size
+
+
+def probe_missing_sizes(info, selected_info, timeout=cfg.PROBE_WAIT):
+    """Probe the selected formats lacking a size, waiting at most timeout.
+
+    Results that arrive in time are written as PROBE_KEY on the selected
+    formats and on the matching entries of info["formats"] (so they can be
+    cached with the metadata). Returns (probed_in_time, still_running); the
+    probes still running only update selected_info when they finish.
+    """
+    if not cfg.PROBE_ENABLED:
+        return False, []
+
+    formats = selected_info.get("requested_formats") or [selected_info]
+    missing = [f for f in formats if not known_size(f)]
+    if not missing:
+        return False, []
+
+    duration = selected_info.get("duration")
+    executor = _get_executor()
+    futures = {executor.submit(_probe_into, f, duration): f for f in missing}
+    done, pending = wait(futures, timeout=timeout)
+
+    by_id = {f.get("format_id"): f for f in info.get("formats") or []}
+    for future in done:
+        fmt = futures[future]
+        target = by_id.get(fmt.get("format_id"))
+        if target is not None and fmt.get(PROBE_KEY):
+            target[PROBE_KEY] = fmt[PROBE_KEY]
+
+    probed = sum(futures[f].get(PROBE_KEY, 0) for f in done)
+    if probed:
+        print(f"[INFO] Probed missing stream sizes: {probed/1024/1024:.1f} MB")
+    return bool(probed), list(pending)
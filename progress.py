@@ -0,0 +1,263 @@
+"""
+0xDownloader - Progress estimator
+
+Job-level progress figures for the download hooks: an EWMA speed over the bytes
+actually transferred by all streams, an ETA over the whole job (remaining bytes
+plus the expected merge/convert time learned from past jobs) and coalesced UI
+emission. Every update is O(1) since the hook fires thousands of times per job.
+"""
+
+import json
+import math
+import os
+import threading
+import time
+
+import config as cfg
+
+
+def format_speed(bytes_per_sec):
+    return f"{bytes_per_sec/1024/1024:.2f} MB/s" if bytes_per_sec > 0 else "-- MB/s"
+
+
+def format_eta(seconds):
+    if seconds is None:
+        return "--:--"
+    m, s = divmod(int(seconds), 60)
+    if m >= 60:
+        h, m = divmod(m, 60)
+        return f"{int(h)}:{int(m):02}:{int(s):02}"
+    return f"{int(m):02}:{int(s):02}"
+
+
+def format_size(total_bytes):
+    return f"{total_bytes/1024/1024:.1f} MB" if total_bytes else "---"
+
+
+# ============================================================================
+# MERGE TIME MODEL
+# ============================================================================
+
+
+class MergeTimeModel:
+    """Learned post-processing throughput (bytes/s) per kind of job.
+
+    "merge" is a stream-copy merge/remux, "transcode" a merge re-encoding the
+    audio, "audio" an mp3 conversion and "audio_copy" a native audio remux.
+    Each finished job nudges the wall and CPU rates with an EWMA; they are
+    persisted so the first ETA of the next session is already realistic.
+    """
+
+    DEFAULT_RATES = {
+        "merge": cfg.PROGRESS_MERGE_RATE,
+        "transcode": cfg.PROGRESS_TRANSCODE_RATE,
+        "audio": cfg.PROGRESS_AUDIO_RATE,
+        "audio_copy": cfg.PROGRESS_MERGE_RATE,
+    }
+
+    def __init__(self, state_file=None):
+        self.state_file = state_file or os.path.join(
+            os.getcwd(), cfg.CACHE_FOLDER_NAME, "merge_stats.json"
+        )
+        self._lock = threading.Lock()
+        self._rates = None
+
+    def _load(self):
+        if self._rates is not None:
+            return
+        try:
+            with open(self.state_file, "r", encoding="utf-8") as f:
+                self._rates = {k: float(v) for k, v in json.load(f).items()}
+        except (OSError, ValueError, TypeError, AttributeError):
+            self._rates = {}
+
+    def _save(self):
+        try:
+            os.makedirs(os.path.dirname(self.state_file), exist_ok=True)
+            with open(self.state_file + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(self._rates, f)
+            os.replace(self.state_file + ".tmp", self.state_file)
+        except OSError:
+            pass
+
+    def rate(self, kind):
+        with self._lock:
+            self._load()
+            return self._rates.get(kind) or self.DEFAULT_RATES.get(kind, 0)
+
+    def estimate(self, kind, total_bytes):
+        """Expected post-processing seconds for total_bytes (0 when unknown)"""
+        rate = self.rate(kind)
+        return total_bytes / rate if total_bytes and rate > 0 else 0.0
+
+    def estimate_cpu(self, kind, total_bytes):
+        """Expected ffmpeg CPU seconds (assumed equal to wall time until learned)"""
+        with self._lock:
+            self._load()
+            rate = self._rates.get(f"{kind}_cpu")
+        if not rate:
+            return self.estimate(kind, total_bytes)
+        return total_bytes / rate if total_bytes else 0.0
+
+    def record(self, kind, total_bytes, seconds, cpu_seconds=None):
+        if not kind or not total_bytes or seconds <= 0:
+            return
+        samples = {kind: total_bytes / seconds}
+        if cpu_seconds:
+            samples[f"{kind}_cpu"] = total_bytes / cpu_seconds
+        with self._lock:
+            self._load()
+            alpha = cfg.PROGRESS_MERGE_LEARNING_RATE
+            for key, observed in samples.items():
+                previous = self._rates.get(key)
+                if previous is None:
+                    self._rates[key] = observed
+                else:
+                    self._rates[key] = previous + alpha * (observed - previous)
+            self._save()
+
+
+merge_model = MergeTimeModel()
+
+
+# ============================================================================
+# PROGRESS ESTIMATOR
+# ============================================================================
+
+
+class ProgressEstimator:
+    """Speed/ETA/emission state for one download job.
+
+    Feed it with update(bytes_done, transferred) from the progress hook:
+    bytes_done is what is on disk for the whole job (resumed bytes included),
+    transferred is what came over the network since the previous call and is
+    the only thing that counts towards the speed. The clock is injectable.
+    """
+
+    def __init__(
+        self,
+        total_bytes,
+        kind="merge",
+        merge_model=merge_model,
+        clock=time.monotonic,
+        half_life=cfg.PROGRESS_SPEED_HALF_LIFE,
+        sample_interval=cfg.PROGRESS_SAMPLE_INTERVAL,
+        emit_interval=cfg.DL_UI_UPDATE_DELAY,
+    ):
+        self.total_bytes = total_bytes or 0
+        self.kind = kind
+        self.merge_model = merge_model
+        self.clock = clock
+        self.half_life = half_life
+        self.sample_interval = sample_interval
+        self.emit_interval = emit_interval
+
+        self.bytes_done = 0
+        self.speed = 0.0
+        self._pending_bytes = 0
+        self._sample_start = None
+        self._last_emit = None
+        self._merge_started = None
+        self._merge_cpu_start = None
+        self._merge_estimate = (
+            merge_model.estimate(kind, self.total_bytes) if merge_model else 0.0
+        )
+
+    # --- feeding ---
+
+    def set_total(self, total_bytes):
+        """Late total (e.g. from a size probe that finished after the start)"""
+        self.total_bytes = total_bytes or 0
+        if self.merge_model:
+            self._merge_estimate = self.merge_model.estimate(
+                self.kind, self.total_bytes
+            )
+
+    def update(self, bytes_done, transferred=0):
+        """Record progress; returns True when the UI should be refreshed now"""
+        now = self.clock()
+        self.bytes_done = bytes_done
+
+        if self._sample_start is None:
+            self._sample_start = now
+        elif transferred > 0:
+            self._pending_bytes += transferred
+
+        elapsed = now - self._sample_start
+        if elapsed >= self.sample_interval:
+            # Time-based decay keeps the average fair for irregular callbacks
+            rate = self._pending_bytes / elapsed
+            weight = 1.0 - math.pow(0.5, elapsed / self.half_life)
+            if self.speed <= 0:
+                self.speed = rate
+            else:
+                self.speed += weight * (rate - self.speed)
+            self._pending_bytes = 0
+            self._sample_start = now
+
+        return self._should_emit(now)
+
+    def reset_speed(self):
+        """Forget the running sample (e.g. after a pause) but keep the average"""
+        self._pending_bytes = 0
+        self._sample_start = None
+
+    def _should_emit(self, now):
+        if self._last_emit is not None and now - self._last_emit < self.emit_interval:
+            return False
+        self._last_emit = now
+        return True
+
+    def force_emit(self):
+        self._last_emit = self.clock()
+
+    # --- merge phase ---
+
+    def start_merge(self, cpu_time=None):
+        if self._merge_started is None:
+            self._merge_started = self.clock()
+            self._merge_cpu_start = cpu_time
+
+    def finish_merge(self, cpu_time=None):
+        """Teach the merge model how long post-processing took for this job.
+
+        Returns (wall, cpu) seconds, cpu being None without both CPU readings,
+        or None when no post-processing ran.
+        """
+        if self._merge_started is None:
+            return None
+        wall = self.clock() - self._merge_started
+        cpu = None
+        if cpu_time is not None and self._merge_cpu_start is not None:
+            cpu = cpu_time - self._merge_cpu_start
+        self._merge_started = None
+        if self.merge_model:
+            self.merge_model.record(self.kind, self.total_bytes, wall, cpu)
+        return wall, cpu
+
+    # --- figures ---
+
+    @property
+    def percent(self):
+        if not self.total_bytes:
+            return 0.0
+        return min(self.bytes_done / self.total_bytes * 100, 99.9)
+
+    @property
+    def eta(self):
+        """Seconds until the job is done (download + merge), None when unknown"""
+        if self._merge_started is not None:
+            return max(self._merge_estimate - (self.clock() - self._merge_started), 0)
+        if not self.total_bytes or self.speed <= 0:
+            return None
+        remaining = max(self.total_bytes - self.bytes_done, 0)
+        return remaining / self.speed + self._merge_estimate
+
+    def figures(self):
+        """(percent, speed, eta, size) strings as expected by progress callbacks"""
+        return (
+            self.percent,
+            format_speed(self.speed),
+            format_eta(self.eta),
+            format_size(self.total_bytes),
+        )
@@ -0,0 +1,195 @@
+"""
+0xDownloader - Network sessions
+
+One set of yt-dlp request handlers shared by every download, size probe and
+warm-up for the whole app session, so back-to-back jobs reuse keep-alive
+connections to the media hosts instead of each YoutubeDL opening its own. Host
+lookups go through a small TTL cache, and the media host of a video is
+contacted while the user is still picking a quality.
+"""
+
+import socket
+import threading
+import time
+from urllib.parse import urlparse
+
+import yt_dlp
+from yt_dlp.networking import Request
+
+import config as cfg
+
+
+# ============================================================================
+# DNS CACHE
+# ============================================================================
+
+
+class DNSCache:
+    """TTL cache in front of socket.getaddrinfo, installed process-wide"""
+
+    def __init__(self, ttl=cfg.NET_DNS_CACHE_TTL, max_entries=cfg.NET_DNS_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._resolve = None
+
+    def install(self):
+        with self._lock:
+            if self._resolve is None:
+                self._resolve = socket.getaddrinfo
+                socket.getaddrinfo = self.getaddrinfo
+
+    def getaddrinfo(self, host, port, *args, **kwargs):
+        key = (host, port, args, tuple(sorted(kwargs.items())))
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self.hits += 1
+                return list(entry[1])
+
+        # Failures are not cached: the next attempt resolves again
+        result = self._resolve(host, port, *args, **kwargs)
+        with self._lock:
+            self.misses += 1
+            if len(self._entries) >= self.max_entries:
+                self._entries = {k: v for k, v in self._entries.items() if v[0] > now}
+                if len(self._entries) >= self.max_entries:
+                    self._entries.clear()
+            self._entries[key] = (now + self.ttl, result)
+        return list(result)
+
+
+# ============================================================================
+# SHARED SESSION
+# ============================================================================
+
+
+class _SharedDirector:
+    """Borrowed view of the shared RequestDirector.
+
+    Download YoutubeDL instances are opened and closed per stream; their
+    close() must not tear down the connection pools other jobs are using.
+    """
+
+    def __init__(self, director):
+        self._director = director
+
+    def __getattr__(self, name):
+        return getattr(self._director, name)
+
+    def close(self):
+        pass
+
+
+class SessionManager:
+    """Long-lived request handlers every download and probe is routed through"""
+
+    def __init__(self):
+        self.dns = DNSCache()
+        self._lock = threading.Lock()
+        self._ydl = None
+        self._director = None
+        self._warmed = {}  # host -> monotonic time of the last warm-up
+
+    def network_options(self):
+        return {
+            "quiet": True,
+            "no_warnings": True,
+            "nocheckcertificate": True,
+            "socket_timeout": cfg.DL_SOCKET_TIMEOUT,
+        }
+
+    def _session(self):
+        with self._lock:
+            if self._ydl is None:
+                if cfg.NET_DNS_CACHE_TTL > 0:
+                    self.dns.install()
+                self._ydl = yt_dlp.YoutubeDL(self.network_options())
+                self._director = _SharedDirector(self._ydl._request_director)
+            return self._ydl
+
+    # --- public API ---
+
+    def attach(self, ydl):
+        """Route ydl's HTTP traffic through the shared handlers"""
+        if cfg.NET_SHARED_SESSION:
+            self._session()
+            # _request_director is a cached property: pre-filling it means ydl
+            # never builds (nor closes) handlers of its own
+            ydl.__dict__["_request_director"] = self._director
+        return ydl
+
+    def urlopen(self, request, timeout=None):
+        """Send a yt_dlp.networking Request through the shared handlers"""
+        if timeout is not None:
+            request.extensions["timeout"] = timeout
+        return self._session().urlopen(request)
+
+    def prewarm(self, url, headers=None, background=True):
+        """Open a connection to url's host ahead of the download.
+
+        A HEAD resolves the host (filling the DNS cache) and leaves a
+        keep-alive connection in the pool for the first stream request.
+        Hosts warmed within NET_PREWARM_INTERVAL are skipped.
+        """
+        host = urlparse(url or "").hostname
+        if not cfg.NET_PREWARM or not host:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if now - self._warmed.get(host, -cfg.NET_PREWARM_INTERVAL) < (
+                cfg.NET_PREWARM_INTERVAL
+            ):
+                return
+            self._warmed[host] = now
+
+        def _task():
+            try:
+                response = self.urlopen(
+                    Request(url, headers=headers or {}, method="HEAD"),
+                    cfg.NET_PREWARM_TIMEOUT,
+                )
+                response.close()
+            except Exception:
+                # Only the connection matters; a refused HEAD still warmed DNS
+                pass
+
+        if background:
+            threading.Thread(target=_task, name="net-prewarm", daemon=True).start()
+        else:
+            _task()
+
+    def prewarm_video(self, info, format_spec=None):
+        """Warm the media host of the format a video will most likely use"""
+        formats = info.get("formats") or []
+        wanted = (format_spec or "").split("+")[0]
+        fmt = next((f for f in formats if f.get("format_id") == wanted), None)
+        if fmt is None:
+            fmt = next(
+                (f for f in reversed(formats) if f.get("protocol") == "https"), None
+            )
+        if fmt and fmt.get("url"):
+            self.prewarm(fmt["url"], fmt.get("http_headers"))
+
+    def stats(self):
+        return {
+            "shared": cfg.NET_SHARED_SESSION,
+            "open": self._ydl is not None,
+            "dns_hits": self.dns.hits,
+            "dns_misses": self.dns.misses,
+            "warmed_hosts": len(self._warmed),
+        }
+
+    def close(self):
+        with self._lock:
+            if self._ydl is not None:
+                self._ydl.close()
+                self._ydl = None
+                self._director = None
+
+
+sessions = SessionManager()
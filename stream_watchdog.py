@@ -0,0 +1,197 @@
+"""
+0xDownloader - Stream watchdog
+
+Throughput watchdog for the streams of one download. Throttled streams rarely
+fail: they keep going at a few KB/s. A stream whose smoothed speed collapses
+far below its own recent baseline and below what its bitrate needs, for a few
+seconds in a row, gets reconnected (the partial file continues with a range
+request); when reconnecting doesn't help, the video is re-extracted for fresh
+URLs, which usually point to another server. Every intervention and its
+outcome is printed and appended to a JSON-lines log for threshold tuning.
+"""
+
+import collections
+import json
+import os
+import threading
+import time
+
+import config as cfg
+from bandwidth import limiter
+from progress import format_speed
+
+ACTION_RECONNECT = "reconnect"
+ACTION_REEXTRACT = "reextract"
+
+_log_lock = threading.Lock()
+
+
+def log_event(record):
+    """Append one watchdog record to the JSON-lines log"""
+    path = os.path.join(os.getcwd(), cfg.CACHE_FOLDER_NAME, cfg.WATCHDOG_LOG_FILE)
+    with _log_lock:
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+        except OSError:
+            pass
+
+
+class _StreamRate:
+    """Smoothed speed, rolling baseline and slow streak of one stream"""
+
+    def __init__(self, expected, now):
+        self.expected = expected  # bytes/s the bitrate needs, 0 = unknown
+        self.reconnects = 0
+        self.given_up = False
+        self.peaks = collections.deque()  # (time, smoothed speed)
+        self.pending = None  # last intervention, waiting for its outcome
+        self.restart(now)
+
+    def restart(self, now):
+        """New connection: speed and slow streak start over, baseline stays"""
+        self.connected_at = now
+        self.last = None  # (time, downloaded bytes)
+        self.speed = None
+        self.slow_since = None
+
+    def sample(self, downloaded, now):
+        """Fold a progress report in; True when a new speed sample was taken"""
+        if self.last is not None:
+            elapsed = now - self.last[0]
+            if elapsed < cfg.WATCHDOG_SAMPLE_INTERVAL:
+                return False
+            rate = max(0, downloaded - self.last[1]) / elapsed
+            if self.speed is None:
+                self.speed = rate
+            else:
+                weight = 0.5 ** (elapsed / cfg.WATCHDOG_HALF_LIFE)
+                self.speed = self.speed * weight + rate * (1 - weight)
+            self.peaks.append((now, self.speed))
+            while now - self.peaks[0][0] > cfg.WATCHDOG_BASELINE_WINDOW:
+                self.peaks.popleft()
+        self.last = (now, downloaded)
+        return self.speed is not None
+
+    @property
+    def baseline(self):
+        return max((speed for _, speed in self.peaks), default=0)
+
+    def collapsed(self):
+        """Slow enough to count as throttled (see the WATCHDOG_* ratios)"""
+        expected = self.expected
+        if expected and self.speed < expected * cfg.WATCHDOG_STARVED_RATIO:
+            return True
+        if self.speed >= self.baseline * cfg.WATCHDOG_COLLAPSE_RATIO:
+            return False
+        return not expected or self.speed < expected * cfg.WATCHDOG_EXPECTED_FACTOR
+
+
+class StreamWatchdog:
+    """Decides when the streams of one download need a new connection"""
+
+    def __init__(self, label):
+        self.label = label
+        self.reextracts = 0
+        self._lock = threading.Lock()
+        self._streams = {}
+
+    # --- public API ---
+
+    def update(self, key, downloaded, fmt=None):
+        """Action due for stream key after a progress report (None = healthy)"""
+        now = time.monotonic()
+        with self._lock:
+            stream = self._streams.get(key)
+            if stream is None:
+                tbr = (fmt or {}).get("tbr") or 0
+                stream = self._streams[key] = _StreamRate(tbr * 1000 / 8, now)
+
+            if stream.given_up or not stream.sample(downloaded, now):
+                return None
+            if now - stream.connected_at < cfg.WATCHDOG_WARMUP:
+                return None
+            if stream.pending is not None:
+                self._report_outcome(key, stream)
+
+            # A bandwidth cap slows streams down on purpose
+            if limiter.enabled or not stream.collapsed():
+                stream.slow_since = None
+                return None
+            if stream.slow_since is None:
+                stream.slow_since = now
+            if now - stream.slow_since < cfg.WATCHDOG_GRACE:
+                return None
+
+            action = self._next_action(stream)
+            self._report_intervention(key, stream, action, now)
+            return action
+
+    def reconnected(self, key=None, rearm=False):
+        """Stream key (default: every stream) got a new connection.
+
+        rearm gives the streams their reconnects back, after fresh URLs.
+        """
+        now = time.monotonic()
+        with self._lock:
+            for name, stream in self._streams.items():
+                if key is None or name == key:
+                    if rearm:
+                        stream.reconnects = 0
+                        stream.given_up = False
+                    stream.restart(now)
+
+    # --- internals ---
+
+    def _next_action(self, stream):
+        if stream.reconnects < cfg.WATCHDOG_MAX_RECONNECTS:
+            stream.reconnects += 1
+            return ACTION_RECONNECT
+        if self.reextracts < cfg.WATCHDOG_MAX_REEXTRACTS:
+            self.reextracts += 1
+            return ACTION_REEXTRACT
+        stream.given_up = True
+        return None
+
+    def _report_intervention(self, key, stream, action, now):
+        record = {
+            "time": time.time(),
+            "job": self.label,
+            "stream": key,
+            "action": action or "give_up",
+            "speed": round(stream.speed),
+            "baseline": round(stream.baseline),
+            "expected": round(stream.expected),
+            "slow_for": round(now - stream.slow_since, 1),
+            "reconnects": stream.reconnects,
+            "reextracts": self.reextracts,
+        }
+        stream.pending = record if action else None
+        needs = f", needs {format_speed(stream.expected)}" if stream.expected else ""
+        print(
+            f"[WARNING] Watchdog: stream {key} at {format_speed(stream.speed)} "
+            f"(baseline {format_speed(stream.baseline)}{needs}) "
+            f"for {record['slow_for']:.0f}s -> {record['action']}"
+        )
+        log_event(record)
+
+    def _report_outcome(self, key, stream):
+        record, stream.pending = stream.pending, None
+        recovered = not stream.collapsed()
+        print(
+            f"[INFO] Watchdog: stream {key} at {format_speed(stream.speed)} "
+            f"after {record['action']} ({'recovered' if recovered else 'still slow'})"
+        )
+        log_event(
+            {
+                "time": time.time(),
+                "job": self.label,
+                "stream": key,
+                "action": "outcome",
+                "after": record["action"],
+                "speed_before": record["speed"],
+                "speed_after": round(stream.speed),
+                "recovered": recovered,
+            }
+        )
@@ -0,0 +1,53 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from jobs import pick_resolution, validate_request
+
+
+class ValidateRequestTest(unittest.TestCase):
+    """Resolutions come back as labels run_download understands"""
+
+    def test_audio_any_case_becomes_audio_only(self):
+        for resolution in ("audio", "AUDIO", "audio only", "Audio Only"):
+            self.assertEqual(
+                validate_request(resolution, None, None), ("Audio Only", None, None)
+            )
+
+    def test_best_is_resolved_by_the_extract_stage(self):
+        for resolution in ("best", "Best", " BEST "):
+            self.assertEqual(
+                validate_request(resolution, None, None), (None, "best", None)
+            )
+
+    def test_heights_and_limits_pass_through(self):
+        self.assertEqual(validate_request("1080p", None, 0), ("1080p", None, None))
+        self.assertEqual(validate_request(None, "<=720", "5e5"), (None, "<=720", 5e5))
+
+    def test_unknown_values_are_rejected(self):
+        with self.assertRaises(ValueError):
+            validate_request("ultra", None, None)
+        with self.assertRaises(ValueError):
+            validate_request(None, "sharp", None)
+        with self.assertRaises(ValueError):
+            validate_request("720p", None, -1)
+
+
+class PickResolutionTest(unittest.TestCase):
+    resolutions = ["1080p", "720p", "360p"]
+
+    def test_audio_and_best(self):
+        self.assertEqual(pick_resolution(self.resolutions, "Audio"), "Audio Only")
+        self.assertEqual(pick_resolution(self.resolutions, "best"), "1080p")
+        self.assertEqual(pick_resolution(self.resolutions, None), "1080p")
+
+    def test_best_without_heights_fails(self):
+        with self.assertRaises(ValueError):
+            pick_resolution([], "best")
+        self.assertEqual(pick_resolution([], "audio"), "Audio Only")
+
+
+if __name__ == "__main__":
+    unittest.main()
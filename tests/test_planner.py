@@ -0,0 +1,43 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config as cfg
+from planner import PLAN_TRANSCODE, plan_postprocessing
+
+
+class LoneTranscodeTest(unittest.TestCase):
+    """A single file mp4 can't carry: only the audio is re-encoded"""
+
+    def test_vp9_opus_copies_video_and_caps_audio(self):
+        info = {"ext": "webm", "vcodec": "vp09.00.40.08", "acodec": "opus", "abr": 96}
+        plan = plan_postprocessing(info)
+        self.assertEqual(plan.mode, PLAN_TRANSCODE)
+        self.assertFalse(plan.merged)
+
+        inputs, options = plan.ffmpeg_args([(info, "in.webm")], "out.mp4")
+        self.assertEqual(inputs, ["in.webm"])
+        self.assertEqual(
+            options[:6], ["-c:v", "copy", "-c:a", "aac", "-b:a", "96k"]
+        )
+        self.assertIn("+faststart", options)
+
+    def test_bitrate_capped_at_configured_target(self):
+        info = {"ext": "webm", "vcodec": "vp9", "acodec": "opus", "abr": 512}
+        plan = plan_postprocessing(info)
+        _, options = plan.ffmpeg_args([(info, "in.webm")], "out.mp4")
+        target = cfg.DL_AUDIO_BITRATE.rstrip("kK")
+        self.assertEqual(options[options.index("-b:a") + 1], f"{target}k")
+
+    def test_unsupported_video_is_not_copied(self):
+        info = {"ext": "flv", "vcodec": "flv1", "acodec": "opus", "abr": 64}
+        plan = plan_postprocessing(info)
+        _, options = plan.ffmpeg_args([(info, "in.flv")], "out.mp4")
+        self.assertNotIn("-c:v", options)
+        self.assertEqual(options[:4], ["-c:a", "aac", "-b:a", "64k"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,219 @@
+"""
+0xDownloader - Throttle controller
+
+Process-wide throttling/backoff state shared by metadata analysis and downloads:
+throttle detection, exponential backoff with jitter, a per-host circuit breaker,
+iterative retries, and persistence across app restarts.
+"""
+
+import json
+import os
+import random
+import threading
+import time
+from urllib.parse import urlparse
+
+import config as cfg
+
+THROTTLE_INDICATORS = (
+    "throttling",
+    "429",
+    "too many requests",
+    "rate limit",
+    "slow down",
+    "temporary failure",
+)
+
+CIRCUIT_CLOSED = "closed"
+CIRCUIT_OPEN = "open"
+CIRCUIT_HALF_OPEN = "half_open"
+
+
+class ThrottledError(Exception):
+    """Raised when a host keeps throttling after all retries were spent"""
+
+    def __init__(self, host):
+        super().__init__(f"Throttling: retries exhausted for {host}")
+        self.host = host
+
+
+def host_key(url):
+    """Throttling bucket for a URL (all YouTube front-ends share one)"""
+    host = urlparse(url or "").netloc.lower().split(":")[0]
+    for prefix in ("www.", "m.", "music."):
+        if host.startswith(prefix):
+            host = host[len(prefix) :]
+    if host == "youtu.be":
+        host = "youtube.com"
+    return host or "default"
+
+
+def detect_throttling(error_msg) -> bool:
+    """Detect whether the error message indicates throttling / rate-limiting."""
+    error_lower = str(error_msg).lower()
+    return any(indicator in error_lower for indicator in THROTTLE_INDICATORS)
+
+
+class ThrottleController:
+    """Shared backoff and circuit breaker state, keyed by host"""
+
+    def __init__(self, state_file=None):
+        self.state_file = state_file or os.path.join(
+            os.getcwd(), cfg.CACHE_FOLDER_NAME, "throttle_state.json"
+        )
+        self._lock = threading.Lock()
+        self._hosts = self._load()
+
+    # --- persistence ---
+
+    def _load(self):
+        try:
+            with open(self.state_file, "r", encoding="utf-8") as f:
+                hosts = json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+        # Forget hosts that have been quiet for a while
+        now = time.time()
+        return {
+            h: s
+            for h, s in hosts.items()
+            if now - s.get("last_throttle", 0) < cfg.THROTTLE_STATE_TTL
+        }
+
+    def _save(self):
+        try:
+            os.makedirs(os.path.dirname(self.state_file), exist_ok=True)
+            with open(self.state_file + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(self._hosts, f)
+            os.replace(self.state_file + ".tmp", self.state_file)
+        except OSError:
+            pass
+
+    def _host_state(self, host):
+        return self._hosts.setdefault(
+            host,
+            {
+                "failures": 0,
+                "next_allowed_at": 0,
+                "circuit": CIRCUIT_CLOSED,
+                "opened_at": 0,
+                "last_throttle": 0,
+            },
+        )
+
+    # --- backoff ---
+
+    def _backoff_delay(self, failures):
+        """Exponential backoff (capped) with equal jitter."""
+        delay = cfg.THROTTLE_RETRY_DELAY * (
+            cfg.THROTTLE_BACKOFF_MULTIPLIER ** max(failures - 1, 0)
+        )
+        delay = min(delay, cfg.THROTTLE_MAX_DELAY)
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def record_throttle(self, host):
+        """Register a throttling hit for host and return the delay to honour"""
+        with self._lock:
+            s = self._host_state(host)
+            now = time.time()
+            s["failures"] += 1
+            s["last_throttle"] = now
+
+            if s["circuit"] == CIRCUIT_HALF_OPEN or (
+                s["failures"] >= cfg.THROTTLE_CIRCUIT_THRESHOLD
+            ):
+                s["circuit"] = CIRCUIT_OPEN
+                s["opened_at"] = now
+                delay = cfg.THROTTLE_CIRCUIT_COOLDOWN
+            else:
+                delay = self._backoff_delay(s["failures"])
+
+            s["next_allowed_at"] = max(s["next_allowed_at"], now + delay)
+            self._save()
+            return s["next_allowed_at"] - now
+
+    def record_success(self, host):
+        with self._lock:
+            if host not in self._hosts:
+                return
+            del self._hosts[host]
+            self._save()
+
+    def wait_time(self, host):
+        """Seconds until host may be contacted again (0 when allowed now)"""
+        with self._lock:
+            s = self._hosts.get(host)
+            if not s:
+                return 0
+            now = time.time()
+            remaining = max(0.0, s["next_allowed_at"] - now)
+            if remaining == 0 and s["circuit"] == CIRCUIT_OPEN:
+                # Cooldown is over: let a single trial request through
+                s["circuit"] = CIRCUIT_HALF_OPEN
+                self._save()
+            return remaining
+
+    def circuit_state(self, host):
+        with self._lock:
+            s = self._hosts.get(host)
+            return s["circuit"] if s else CIRCUIT_CLOSED
+
+    def wait_until_allowed(self, host, check_abort=None):
+        """Sleep until host is allowed again; False if aborted meanwhile"""
+        while True:
+            remaining = self.wait_time(host)
+            if remaining <= 0:
+                return True
+            if check_abort and check_abort():
+                return False
+            time.sleep(min(remaining, 0.5))
+
+    # --- retry loop ---
+
+    def run(self, url, fn, check_abort=None, on_wait=None):
+        """Call fn(), retrying iteratively while the host throttles.
+
+        Honors the shared backoff before each attempt, gives up after
+        THROTTLE_MAX_RETRIES throttled attempts by raising ThrottledError,
+        and re-raises any non-throttling exception unchanged.
+        """
+        host = host_key(url)
+        attempts = 0
+
+        while True:
+            remaining = self.wait_time(host)
+            if remaining > 0 and on_wait:
+                on_wait(remaining)
+            if not self.wait_until_allowed(host, check_abort):
+                raise ThrottledError(host)
+
+            try:
+                result = fn()
+            except Exception as e:
+                if isinstance(e, ThrottledError) or not detect_throttling(e):
+                    raise
+                attempts += 1
+                delay = self.record_throttle(host)
+                if attempts > cfg.THROTTLE_MAX_RETRIES:
+                    raise ThrottledError(host) from e
+                print(
+                    f"[WARNING] Throttling detected. Waiting {int(delay)}s before retry..."
+                )
+                continue
+
+            self.record_success(host)
+            return result
+
+
+_controller = None
+_controller_lock = threading.Lock()
+
+
+def get_controller():
+    """Process-wide ThrottleController singleton"""
+    global _controller
+    with _controller_lock:
+        if _controller is None:
+            _controller = ThrottleController()
+        return _controller